@@ -0,0 +1,111 @@
+import os
+import html
+import logging
+from collections import Counter, OrderedDict
+
+logger = logging.getLogger(__name__)
+
+# Reactions, signups and suggestions are collected in memory and sent to the admin
+# as one digest per window, instead of one Telegram message per event.
+DIGEST_WINDOW_SECONDS = int(os.getenv("ADMIN_DIGEST_SECONDS", "300"))
+# Telegram limit is 4096 characters per message
+MAX_MESSAGE_LENGTH = 4000
+MAX_NAMES_PER_POST = 5
+# Titles, user names and post labels are cut to this before escaping, so every line stays
+# far below the message limit and no tag or entity is ever split
+MAX_FIELD_LENGTH = 200
+
+
+def _field(text):
+    """
+    Free text as safe HTML: truncated first, then escaped.
+    """
+    text = str(text)
+    if len(text) > MAX_FIELD_LENGTH:
+        text = text[:MAX_FIELD_LENGTH - 1] + "…"
+    return html.escape(text)
+
+
+class AdminDigest:
+    """
+    In-memory event aggregator. render() returns the digest messages (HTML) and starts a new window.
+    User names and titles are free text: HTML escaping is reliable where Markdown breaks on "_" or "*".
+    """
+
+    def __init__(self):
+        self._reset()
+
+    def _reset(self):
+        self.reactions = OrderedDict()  # post label -> Counter(emoji -> count)
+        self.reactors = {}  # post label -> list of user names (first few)
+        self.signups = []  # (user_name, chat_id)
+        self.suggestions = []  # (user_name, user_id, title, close catalog match or None)
+
+    def __len__(self):
+        return sum(sum(c.values()) for c in self.reactions.values()) + len(self.signups) + len(self.suggestions)
+
+    def add_reaction(self, post_label, emoji, user_name):
+        self.reactions.setdefault(post_label, Counter())[emoji] += 1
+        names = self.reactors.setdefault(post_label, [])
+        if len(names) < MAX_NAMES_PER_POST and user_name not in names:
+            names.append(user_name)
+
+    def add_signup(self, user_name, chat_id):
+        self.signups.append((user_name, chat_id))
+
+    def add_suggestion(self, user_name, user_id, title, close_match=None):
+        """
+        title is what gets proposed for /publish, close_match a similar catalog title
+        that may or may not be the same film (shown as an alternative).
+        """
+        self.suggestions.append((user_name, user_id, title, close_match))
+
+    def _lines(self):
+        e = _field
+        if self.signups:
+            yield f"🔔 <b>Nuovi iscritti: {len(self.signups)}</b>"
+            for user_name, chat_id in self.signups:
+                yield f"👤 {e(user_name)} (<code>{chat_id}</code>)"
+            yield ""
+        if self.suggestions:
+            yield f"💡 <b>Suggerimenti: {len(self.suggestions)}</b>"
+            for user_name, user_id, title, close_match in self.suggestions:
+                yield f"🎬 <b>{e(title)}</b> da {e(user_name)} (<code>{user_id}</code>)"
+                # Quoted: published as written, not taken for the close catalog title
+                argument = f'"{title}"' if close_match else title
+                yield f"<code>/publish {e(argument)}</code>"
+                yield f"<code>/publish_credit {e(user_name)} {e(argument)}</code>"
+                if close_match:
+                    yield f"   🔎 nel catalogo: {e(close_match)}"
+                    yield f"<code>/publish {e(close_match)}</code>"
+            yield ""
+        if self.reactions:
+            total = sum(sum(c.values()) for c in self.reactions.values())
+            yield f"😍 <b>Reazioni: {total}</b>"
+            for post_label, counts in self.reactions.items():
+                emojis = " ".join(f"{emoji}×{count}" for emoji, count in counts.most_common())
+                names = ", ".join(e(name) for name in self.reactors.get(post_label, []))
+                more = sum(counts.values()) - len(self.reactors.get(post_label, []))
+                if more > 0:
+                    names += f" e altri {more}"
+                yield f"🎞 {e(post_label)}: {emojis}"
+                yield f"   👤 {names}"
+
+    def render(self):
+        """
+        Returns the digest as a list of messages (split under the Telegram limit), empty if
+        nothing happened, and clears the aggregator.
+        """
+        if not len(self):
+            return []
+        messages = []
+        current = f"📋 <b>Riepilogo attività</b> (ultimi {max(1, DIGEST_WINDOW_SECONDS // 60)} min)\n"
+        for line in self._lines():
+            if len(current) + len(line) + 1 > MAX_MESSAGE_LENGTH:
+                messages.append(current)
+                current = ""
+            current += line + "\n"
+        if current.strip():
+            messages.append(current)
+        self._reset()
+        return messages
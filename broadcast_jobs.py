@@ -0,0 +1,245 @@
+import os
+import time
+import threading
+import logging
+from collections import namedtuple
+from storage import connect_sqlite
+
+logger = logging.getLogger(__name__)
+
+# Finished jobs (and their recipient rows) are kept this long for inspection
+JOB_RETENTION_DAYS = int(os.getenv("BROADCAST_JOB_RETENTION_DAYS", "7"))
+ITER_BATCH_SIZE = 500
+
+# Recipient status:
+# pending  -> not tried yet
+# inflight -> handed to the sender; if we crash now we cannot know whether it arrived,
+#             so it is never sent again (at-most-once)
+# sent / failed -> final
+PENDING = "pending"
+INFLIGHT = "inflight"
+SENT = "sent"
+FAILED = "failed"
+
+Job = namedtuple("Job", ["job_id", "created_at", "caption", "parse_mode", "image_path", "file_id", "title_key", "finished_at", "render_key"])
+
+
+class BroadcastJobStore:
+    """
+    Durable log of broadcasts: every fan-out is a job with its rendered image on disk
+    and one status row per recipient, so a restart in the middle of a broadcast
+    resumes exactly where it stopped instead of losing (or re-sending) the post.
+    """
+
+    def __init__(self, db_path, assets_dir):
+        self.db_path = db_path
+        self.assets_dir = assets_dir
+        os.makedirs(assets_dir, exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = connect_sqlite(db_path)
+        with self._conn:
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS jobs ("
+                " job_id INTEGER PRIMARY KEY AUTOINCREMENT,"
+                " created_at REAL NOT NULL,"
+                " caption TEXT NOT NULL,"
+                " parse_mode TEXT,"
+                " image_path TEXT,"
+                " file_id TEXT,"
+                " title_key TEXT,"
+                " finished_at REAL,"
+                " render_key TEXT)"
+            )
+            columns = [row[1] for row in self._conn.execute("PRAGMA table_info(jobs)")]
+            if "render_key" not in columns:
+                self._conn.execute("ALTER TABLE jobs ADD COLUMN render_key TEXT")
+            # Older databases recorded the catalog position (catalog_index), which a rebuilt catalog invalidates
+            if "title_key" not in columns:
+                self._conn.execute("ALTER TABLE jobs ADD COLUMN title_key TEXT")
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS job_recipients ("
+                " job_id INTEGER NOT NULL,"
+                " chat_id TEXT NOT NULL,"
+                " status TEXT NOT NULL,"
+                " error TEXT,"
+                " message_id INTEGER,"
+                " PRIMARY KEY (job_id, chat_id)) WITHOUT ROWID"
+            )
+            columns = [row[1] for row in self._conn.execute("PRAGMA table_info(job_recipients)")]
+            if "message_id" not in columns:
+                self._conn.execute("ALTER TABLE job_recipients ADD COLUMN message_id INTEGER")
+            # Maps a reaction (chat, message) back to the broadcast it belongs to
+            self._conn.execute("CREATE INDEX IF NOT EXISTS job_recipients_message ON job_recipients (chat_id, message_id)")
+            self._conn.execute("CREATE INDEX IF NOT EXISTS job_recipients_status ON job_recipients (job_id, status, chat_id)")
+
+    def create(self, caption, chat_ids, image_bytes=None, parse_mode=None, title_key=None, file_id=None, render_key=None):
+        """
+        Records a new broadcast: the image is written to disk and the recipient list is
+        snapshotted, all before the first message goes out. Returns the job id.
+        A photo job needs image_bytes or an already uploaded file_id (or both).
+        title_key is the stable key of the catalog title (see title_deck.title_keys), if any.
+        """
+        with self._lock:
+            with self._conn:
+                cursor = self._conn.execute(
+                    "INSERT INTO jobs (created_at, caption, parse_mode, title_key, file_id, render_key) VALUES (?, ?, ?, ?, ?, ?)",
+                    (time.time(), caption, parse_mode, title_key, file_id, render_key)
+                )
+                job_id = cursor.lastrowid
+                if image_bytes is not None:
+                    image_path = os.path.join(self.assets_dir, f"{job_id}.jpg")
+                    tmp_path = image_path + ".tmp"
+                    with open(tmp_path, 'wb') as f:
+                        f.write(image_bytes)
+                    os.replace(tmp_path, image_path)
+                    self._conn.execute("UPDATE jobs SET image_path = ? WHERE job_id = ?", (image_path, job_id))
+                self._conn.executemany(
+                    "INSERT OR IGNORE INTO job_recipients (job_id, chat_id, status) VALUES (?, ?, ?)",
+                    ((job_id, str(chat_id), PENDING) for chat_id in chat_ids)
+                )
+        logger.info(f"Broadcast job {job_id} created ({self.counts(job_id).get(PENDING, 0)} recipients).")
+        return job_id
+
+    def get(self, job_id):
+        with self._lock:
+            row = self._conn.execute(f"SELECT {', '.join(Job._fields)} FROM jobs WHERE job_id = ?", (job_id,)).fetchone()
+        return Job(*row) if row else None
+
+    def load_image(self, job):
+        if not job.image_path:
+            return None
+        with open(job.image_path, 'rb') as f:
+            return f.read()
+
+    def unfinished(self):
+        with self._lock:
+            rows = self._conn.execute("SELECT job_id FROM jobs WHERE finished_at IS NULL ORDER BY job_id").fetchall()
+        return [job_id for (job_id,) in rows]
+
+    def abandon_inflight(self, job_id):
+        """
+        After a crash: recipients that were being sent are marked failed, never retried.
+        Returns how many.
+        """
+        with self._lock:
+            with self._conn:
+                cursor = self._conn.execute(
+                    "UPDATE job_recipients SET status = ?, error = ? WHERE job_id = ? AND status = ?",
+                    (FAILED, "interrupted", job_id, INFLIGHT)
+                )
+        return cursor.rowcount
+
+    def iter_pending(self, job_id, batch_size=ITER_BATCH_SIZE):
+        """
+        Streams pending recipients, marking each one inflight just before it is handed out.
+        """
+        last = ""
+        while True:
+            with self._lock:
+                rows = self._conn.execute(
+                    "SELECT chat_id FROM job_recipients WHERE job_id = ? AND status = ? AND chat_id > ?"
+                    " ORDER BY chat_id LIMIT ?",
+                    (job_id, PENDING, last, batch_size)
+                ).fetchall()
+            if not rows:
+                return
+            for (chat_id,) in rows:
+                with self._lock:
+                    with self._conn:
+                        self._conn.execute(
+                            "UPDATE job_recipients SET status = ? WHERE job_id = ? AND chat_id = ?",
+                            (INFLIGHT, job_id, chat_id)
+                        )
+                yield chat_id
+            last = rows[-1][0]
+
+    def mark(self, job_id, chat_id, error=None, message_id=None):
+        status, error_text = (SENT, None) if error is None else (FAILED, str(error)[:200])
+        with self._lock:
+            with self._conn:
+                self._conn.execute(
+                    "UPDATE job_recipients SET status = ?, error = ?, message_id = ? WHERE job_id = ? AND chat_id = ?",
+                    (status, error_text, message_id, job_id, str(chat_id))
+                )
+
+    def find_post(self, chat_id, message_id):
+        """
+        Returns the Job whose message (chat_id, message_id) is, or None (not a broadcast, or pruned).
+        """
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT job_id FROM job_recipients WHERE chat_id = ? AND message_id = ?", (str(chat_id), message_id)
+            ).fetchone()
+        return self.get(row[0]) if row else None
+
+    def set_file_id(self, job_id, file_id):
+        with self._lock:
+            with self._conn:
+                self._conn.execute("UPDATE jobs SET file_id = ? WHERE job_id = ?", (file_id, job_id))
+
+    def counts(self, job_id):
+        """
+        Returns {status: number of recipients}.
+        """
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT status, COUNT(*) FROM job_recipients WHERE job_id = ? GROUP BY status", (job_id,)
+            ).fetchall()
+        return dict(rows)
+
+    def finish(self, job_id):
+        """
+        Marks the job done and deletes its image (no longer needed to resume).
+        """
+        job = self.get(job_id)
+        with self._lock:
+            with self._conn:
+                self._conn.execute("UPDATE jobs SET finished_at = ? WHERE job_id = ?", (time.time(), job_id))
+        if job and job.image_path and os.path.exists(job.image_path):
+            os.remove(job.image_path)
+
+    def prune(self, retention_days=JOB_RETENTION_DAYS):
+        cutoff = time.time() - retention_days * 86400
+        with self._lock:
+            with self._conn:
+                self._conn.execute(
+                    "DELETE FROM job_recipients WHERE job_id IN (SELECT job_id FROM jobs WHERE finished_at < ?)", (cutoff,)
+                )
+                self._conn.execute("DELETE FROM jobs WHERE finished_at < ?", (cutoff,))
+
+
+async def run_job(store, broadcaster, bot, job_id, on_result=None):
+    """
+    Sends a job to its remaining recipients and marks it finished. Safe to call again
+    after a crash: only pending recipients are sent to. Returns the DeliveryReport of this run.
+    on_result(chat_id, error) is called after each recipient (error is None on success).
+    """
+    job = store.get(job_id)
+    resumed = store.abandon_inflight(job_id)
+    if resumed:
+        logger.warning(f"Broadcast job {job_id}: {resumed} recipients were in flight at the crash, not re-sent.")
+
+    file_id_saved = job.file_id is not None
+
+    def on_done(chat_id, message, error):
+        nonlocal file_id_saved
+        store.mark(job_id, chat_id, error, message_id=getattr(message, "message_id", None))
+        if on_result is not None:
+            on_result(chat_id, error)
+        if not file_id_saved and error is None and message is not None and message.photo:
+            # Persist the uploaded file_id, so a resumed job never uploads the image again
+            store.set_file_id(job_id, message.photo[-1].file_id)
+            file_id_saved = True
+
+    pending = store.iter_pending(job_id)
+    if job.image_path or job.file_id:
+        report = await broadcaster.broadcast_photo(
+            bot, pending, store.load_image(job), job.caption, file_id=job.file_id, on_done=on_done
+        )
+    else:
+        report = await broadcaster.broadcast(
+            pending, lambda c: bot.send_message(chat_id=c, text=job.caption, parse_mode=job.parse_mode), on_done=on_done
+        )
+    store.finish(job_id)
+    logger.info(f"Broadcast job {job_id} finished: {store.counts(job_id)}")
+    return report
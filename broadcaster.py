@@ -0,0 +1,225 @@
+import os
+import time
+import random
+import asyncio
+import logging
+from dataclasses import dataclass, field
+from telegram.error import RetryAfter, TimedOut, NetworkError, Forbidden, BadRequest
+
+logger = logging.getLogger(__name__)
+
+# Telegram limits: ~30 messages/second overall, ~1 message/second to the same chat.
+# We stay a bit under the global limit.
+GLOBAL_RATE_PER_SECOND = float(os.getenv("BROADCAST_RATE_PER_SECOND", "25"))
+PER_CHAT_INTERVAL_SECONDS = 1.0
+MAX_CONCURRENCY = int(os.getenv("BROADCAST_CONCURRENCY", "20"))
+MAX_ATTEMPTS = 5
+BACKOFF_BASE_SECONDS = 1.0
+BACKOFF_MAX_SECONDS = 30.0
+
+
+def retry_after_seconds(error):
+    # python-telegram-bot >= 22.2 may return a timedelta
+    delay = error.retry_after
+    if hasattr(delay, 'total_seconds'):
+        delay = delay.total_seconds()
+    return float(delay)
+
+
+# BadRequest messages meaning the chat is gone for good
+PERMANENT_BAD_REQUESTS = ("chat not found", "user not found", "peer_id_invalid", "user is deactivated", "chat_id is empty")
+
+
+def is_permanent_error(error):
+    """
+    True if the chat can never be reached again (bot blocked/kicked, user deleted, chat not found).
+    Timeouts, network errors and flood control (RetryAfter) are transient.
+    """
+    if isinstance(error, Forbidden):
+        return True
+    if isinstance(error, BadRequest):
+        message = str(error).lower()
+        return any(reason in message for reason in PERMANENT_BAD_REQUESTS)
+    return False
+
+
+class TokenBucket:
+    """
+    Global rate limiter shared by all concurrent sends.
+    pause() blocks every sender, used when Telegram answers with RetryAfter (flood control is per bot).
+    """
+
+    def __init__(self, rate, capacity=None):
+        self.rate = rate
+        self.capacity = capacity or rate
+        self._tokens = self.capacity
+        self._last = time.monotonic()
+        self._paused_until = 0.0
+        self._lock = None  # Created lazily inside the running event loop
+
+    def pause(self, seconds):
+        self._paused_until = max(self._paused_until, time.monotonic() + seconds)
+        self._tokens = 0
+
+    async def acquire(self):
+        if self._lock is None:
+            self._lock = asyncio.Lock()
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                if now < self._paused_until:
+                    await asyncio.sleep(self._paused_until - now)
+                    continue
+                self._tokens = min(self.capacity, self._tokens + (now - self._last) * self.rate)
+                self._last = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                await asyncio.sleep((1 - self._tokens) / self.rate)
+
+
+@dataclass
+class DeliveryReport:
+    sent: int = 0
+    failed: dict = field(default_factory=dict)  # chat_id -> last error
+    permanent: int = 0  # Failures where the chat is gone for good (see is_permanent_error)
+    retries: int = 0
+    elapsed: float = 0.0
+
+    @property
+    def total(self):
+        return self.sent + len(self.failed)
+
+    def summary(self):
+        return (
+            f"{self.sent}/{self.total} inviati, {len(self.failed)} falliti ({self.permanent} chat non più raggiungibili), "
+            f"{self.retries} retry, {self.elapsed:.1f}s"
+        )
+
+    def record_failure(self, chat_id, error):
+        self.failed[chat_id] = str(error)
+        if is_permanent_error(error):
+            self.permanent += 1
+            logger.info(f"Chat {chat_id} unreachable: {error}")
+        else:
+            logger.error(f"Failed to send to {chat_id}: {error}")
+
+
+class Broadcaster:
+    """
+    Fan-out engine: bounded concurrency, global token bucket, per-chat spacing,
+    RetryAfter handling and exponential backoff on transient network errors.
+    """
+
+    def __init__(self, rate=GLOBAL_RATE_PER_SECOND, concurrency=MAX_CONCURRENCY, max_attempts=MAX_ATTEMPTS):
+        self.bucket = TokenBucket(rate)
+        self.concurrency = concurrency
+        self.max_attempts = max_attempts
+        self._last_sent = {}  # chat_id -> monotonic time of the last send
+
+    async def _wait_for_chat(self, chat_id):
+        last = self._last_sent.get(chat_id)
+        if last is not None:
+            wait = last + PER_CHAT_INTERVAL_SECONDS - time.monotonic()
+            if wait > 0:
+                await asyncio.sleep(wait)
+        self._last_sent[chat_id] = time.monotonic()
+
+    async def send(self, chat_id, send, report=None):
+        """
+        Calls send(chat_id) with rate limiting and retries. Returns its result.
+        Raises the last error if all attempts fail or the error is not retryable.
+        """
+        for attempt in range(1, self.max_attempts + 1):
+            await self._wait_for_chat(chat_id)
+            await self.bucket.acquire()
+            try:
+                return await send(chat_id)
+            except RetryAfter as e:
+                delay = retry_after_seconds(e)
+                logger.warning(f"Flood control: pausing all sends for {delay:.0f}s")
+                self.bucket.pause(delay)
+                error = e
+            except BadRequest:
+                # BadRequest subclasses NetworkError but retrying never helps (chat not found, bad file_id, parse error)
+                raise
+            except (TimedOut, NetworkError) as e:
+                # RetryAfter is not a NetworkError, other TelegramErrors (Forbidden) are final
+                error = e
+                if attempt == self.max_attempts:
+                    break
+                delay = min(BACKOFF_BASE_SECONDS * 2 ** (attempt - 1), BACKOFF_MAX_SECONDS)
+                delay += random.uniform(0, delay / 2)
+                logger.warning(f"Transient error sending to {chat_id} (attempt {attempt}): {e}. Retry in {delay:.1f}s")
+                await asyncio.sleep(delay)
+            if report is not None and attempt < self.max_attempts:
+                report.retries += 1
+        raise error
+
+    async def broadcast(self, chat_ids, send, report=None, on_done=None):
+        """
+        Calls send(chat_id) for every chat with at most `concurrency` sends in flight.
+        chat_ids can be any iterable (even a streaming one). Returns a DeliveryReport.
+        on_done(chat_id, result, error) is called after each chat (error is None on success).
+        """
+        report = report or DeliveryReport()
+        start = time.monotonic()
+        chat_iter = iter(chat_ids)
+
+        async def worker():
+            # Workers pull from the shared iterator, so we never create one task per chat
+            for chat_id in chat_iter:
+                try:
+                    result = await self.send(chat_id, send, report)
+                    report.sent += 1
+                except Exception as e:
+                    report.record_failure(chat_id, e)
+                    result, error = None, e
+                else:
+                    error = None
+                if on_done is not None:
+                    on_done(chat_id, result, error)
+
+        await asyncio.gather(*(worker() for _ in range(self.concurrency)))
+        self._last_sent.clear()
+        report.elapsed += time.monotonic() - start
+        return report
+
+    async def broadcast_photo(self, bot, chat_ids, photo_bytes, caption, file_id=None, on_done=None):
+        """
+        Uploads the photo once (first chat that accepts it), then sends the file_id to everyone else.
+        Pass file_id if the photo was already uploaded (e.g. a resumed broadcast).
+        """
+        report = DeliveryReport()
+        start = time.monotonic()
+        chat_iter = iter(chat_ids)
+
+        while file_id is None:
+            chat_id = next(chat_iter, None)
+            if chat_id is None:
+                break
+            message, error = None, None
+            try:
+                message = await self.send(
+                    chat_id, lambda c: bot.send_photo(chat_id=c, photo=photo_bytes, caption=caption), report
+                )
+                report.sent += 1
+                if message.photo:
+                    # Largest size is the last one
+                    file_id = message.photo[-1].file_id
+            except Exception as e:
+                report.record_failure(chat_id, e)
+                error = e
+            if on_done is not None:
+                on_done(chat_id, message, error)
+        report.elapsed += time.monotonic() - start
+
+        photo = file_id or photo_bytes
+        return await self.broadcast(
+            chat_iter, lambda c: bot.send_photo(chat_id=c, photo=photo, caption=caption), report, on_done
+        )
+
+    async def broadcast_text(self, bot, chat_ids, text, parse_mode=None):
+        return await self.broadcast(
+            chat_ids, lambda c: bot.send_message(chat_id=c, text=text, parse_mode=parse_mode)
+        )
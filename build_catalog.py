@@ -0,0 +1,254 @@
+import os
+import json
+import asyncio
+import argparse
+from catalog import clean_title, extract_year
+from broadcaster import TokenBucket
+from poster_fetch import get_session, close_session
+from catalog_bin import compile_json
+
+# Builds/updates italian_movies_list.json (the catalog the bot draws from).
+# Replaces populate_db.py and populate_db_scraping.py:
+# - concurrent fetching with a politeness rate limit
+# - checkpoint file, so an interrupted run resumes where it stopped
+# - new titles are merged into the existing catalog, with metadata
+#   (year, tmdb_id, poster_path, source) next to each title
+#
+# Usage: python build_catalog.py [--sources cult,tmdb,wikipedia] [--max-pages 100] [--reset]
+
+CATALOG_FILE = "italian_movies_list.json"
+CHECKPOINT_FILE = "catalog_build_checkpoint.json"
+TMDB_API_BASE = "https://api.themoviedb.org/3"
+TMDB_MAX_PAGES = 500  # TMDB never returns more pages than this
+WIKIPEDIA_URL = "https://raw.githubusercontent.com/prust/wikipedia-movie-data/master/movies.json"
+MAX_TITLE_LENGTH = 60
+
+# Lista curata di "Cult Italiani"
+ITALIAN_CULTS = [
+    "Natale in India", "Natale sul Nilo", "Natale a Miami", "Natale a New York", "Natale in Crociera",
+    "Natale a Rio", "Natale a Beverly Hills", "Natale in Sudafrica", "Vacanze di Natale", "Vacanze in America",
+    "Yuppies", "Fracchia la belva umana", "Fantozzi", "Il secondo tragico Fantozzi", "Fantozzi contro tutti",
+    "Fantozzi subisce ancora", "Fantozzi va in pensione", "Fantozzi alla riscossa", "Fantozzi in paradiso",
+    "Tre uomini e una gamba", "Così è la vita", "Chiedimi se sono felice", "La leggenda di Al, John e Jack",
+    "Il ricco, il povero e il maggiordomo", "Checco Zalone", "Cado dalle nubi", "Sole a catinelle", "Quo vado?",
+    "Tolo Tolo", "Benvenuti al Sud", "Benvenuti al Nord", "Maschi contro femmine", "Femmine contro maschi",
+    "Notte prima degli esami", "Ex", "Manuale d'amore", "Immaturi", "Perfetti sconosciuti", "Lo chiamavano Jeeg Robot",
+    "Suburra", "Gomorra", "Romanzo Criminale", "Il Padrino", "Il Padrino - Parte II", "Il Padrino - Parte III",
+    "La vita è bella", "Nuovo Cinema Paradiso", "La grande bellezza", "8½", "La dolce vita", "Amarcord",
+    "Ladri di biciclette", "Riso amaro", "I soliti ignoti", "Amici miei", "Il marchese del grillo", "Bianco, rosso e Verdone",
+    "Un sacco bello", "Viaggi di nozze", "Gallo cedrone", "Grande, grosso e Verdone", "Attila flagello di Dio",
+    "Eccezzziunale veramente", "Al bar dello sport", "L'allenatore nel pallone", "Mezzo destro mezzo sinistro",
+    "Sapore di mare", "Abbronzatissimi", "Rimini Rimini", "Vacanze di Natale '95", "Paparazzi", "Tifosi",
+    "Body Guards", "Merry Christmas", "Christmas in Love", "Vacanze di Natale a Cortina", "Colpi di fulmine",
+    "Colpi di fortuna", "Un Natale stupefacente", "Natale col boss", "Natale a Londra - Dio salvi la regina",
+    "Poveri ma ricchi", "Poveri ma ricchissimi", "Amici come prima", "In vacanza su Marte", "Boris - Il film",
+    "Smetto quando voglio", "Smetto quando voglio - Masterclass", "Smetto quando voglio - Ad honorem", "Fantaghirò",
+    "L'allenatore nel pallone 2", "Alex l'ariete"
+]
+
+
+def normalize(title):
+    return " ".join(title.lower().split())
+
+
+# --- Catalog file (incremental merge) ---
+
+def load_catalog(path):
+    if not os.path.exists(path):
+        return []
+    with open(path, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+
+def save_json_atomic(path, data):
+    tmp_path = path + ".tmp"
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(data, f, ensure_ascii=False)
+    os.replace(tmp_path, path)
+
+
+class CatalogMerger:
+    """
+    Keeps the catalog entries indexed by normalized title.
+    Legacy string entries stay strings until a source brings metadata for them.
+    """
+
+    def __init__(self, entries):
+        self.entries = entries
+        self.index = {}
+        for i, raw in enumerate(entries):
+            title = raw["title"] if isinstance(raw, dict) else clean_title(raw)
+            self.index.setdefault(normalize(title), i)
+        self.added = 0
+        self.enriched = 0
+
+    def merge(self, title, source, year=None, tmdb_id=None, poster_path=None):
+        title = title.strip()
+        if not title or len(title) >= MAX_TITLE_LENGTH:
+            return
+        key = normalize(title)
+        new_entry = {"title": title, "year": year, "tmdb_id": tmdb_id, "poster_path": poster_path, "source": source}
+        if key not in self.index:
+            self.index[key] = len(self.entries)
+            self.entries.append(new_entry)
+            self.added += 1
+            return
+
+        i = self.index[key]
+        old = self.entries[i]
+        if isinstance(old, str):
+            old_year = extract_year(old)
+            if year is not None and old_year is not None and old_year != year:
+                return  # Same title, different film: keep the original
+            if tmdb_id is None and poster_path is None and year is None:
+                return  # Nothing to add
+            new_entry["title"] = clean_title(old)
+            new_entry["year"] = year if year is not None else old_year
+            self.entries[i] = new_entry
+            self.enriched += 1
+        else:
+            # Only fill in missing metadata, never overwrite
+            changed = False
+            for field, value in (("year", year), ("tmdb_id", tmdb_id), ("poster_path", poster_path)):
+                if old.get(field) is None and value is not None:
+                    old[field] = value
+                    changed = True
+            if changed:
+                self.enriched += 1
+
+
+# --- Checkpoint ---
+
+def load_checkpoint(path):
+    if os.path.exists(path):
+        with open(path, 'r') as f:
+            return json.load(f)
+    return {}
+
+
+# --- Sources ---
+
+async def fetch_json(url, limiter, params=None):
+    await limiter.acquire()
+    session = get_session()
+    async with session.get(url, params=params) as response:
+        response.raise_for_status()
+        return await response.json(content_type=None)
+
+
+async def build_from_tmdb(merger, checkpoint, args, limiter):
+    """
+    Italian films from TMDB discover (original language Italian, by popularity).
+    Pages are fetched in concurrent batches; after each batch the catalog and
+    the checkpoint are saved together, so a restart never loses or repeats work.
+    """
+    api_key = os.getenv("TMDB_API_KEY")
+    if not api_key:
+        print("TMDB_API_KEY mancante! Salto la sorgente TMDB.")
+        return
+    state = checkpoint.setdefault("tmdb", {"done_pages": []})
+    done = set(state["done_pages"])
+    max_pages = min(args.max_pages, state.get("total_pages", TMDB_MAX_PAGES), TMDB_MAX_PAGES)
+    todo = [p for p in range(1, max_pages + 1) if p not in done]
+    print(f"TMDB: {len(done)} pagine già fatte, {len(todo)} da scaricare.")
+    semaphore = asyncio.Semaphore(args.concurrency)
+
+    async def fetch_page(page):
+        params = {
+            "api_key": api_key, "language": "it-IT", "with_original_language": "it",
+            "sort_by": "popularity.desc", "include_adult": "false", "page": page
+        }
+        async with semaphore:
+            try:
+                return page, await fetch_json(f"{TMDB_API_BASE}/discover/movie", limiter, params)
+            except Exception as e:
+                print(f"Errore pagina {page}: {e!r}")
+                return page, None
+
+    for start in range(0, len(todo), args.batch):
+        # Pages are in order: once past the real last page there is nothing left to do
+        batch = [p for p in todo[start:start + args.batch] if p <= max_pages]
+        if not batch:
+            break
+        results = await asyncio.gather(*(fetch_page(p) for p in batch))
+        for page, data in results:
+            if data is None:
+                continue  # Not marked as done: retried on the next run
+            for item in data.get("results", []):
+                release_date = item.get("release_date") or ""
+                year = int(release_date[:4]) if release_date[:4].isdigit() else None
+                merger.merge(item.get("title", ""), "tmdb", year=year, tmdb_id=item.get("id"), poster_path=item.get("poster_path"))
+            done.add(page)
+            # TMDB tells us the real number of pages
+            state["total_pages"] = data.get("total_pages", TMDB_MAX_PAGES)
+            max_pages = min(max_pages, state["total_pages"])
+        state["done_pages"] = sorted(done)
+        save_json_atomic(args.output, merger.entries)
+        save_json_atomic(args.checkpoint, checkpoint)
+        print(f"TMDB: {len(done)}/{max_pages} pagine. Nuovi: {merger.added}, arricchiti: {merger.enriched}")
+
+
+async def build_from_wikipedia(merger, checkpoint, args, limiter):
+    """
+    The Wikipedia movie dataset (mostly international films, year >= 1990).
+    """
+    if checkpoint.get("wikipedia", {}).get("done"):
+        print("Wikipedia: già importato.")
+        return
+    print("Scaricamento dataset film Wikipedia...")
+    data = await fetch_json(WIKIPEDIA_URL, limiter)
+    for movie in data:
+        year = movie.get('year', 0)
+        # Prendiamo film dal 1990 in poi per avere roba più pop/conosciuta
+        if year >= 1990:
+            merger.merge(movie.get('title', ''), "wikipedia", year=year)
+    checkpoint["wikipedia"] = {"done": True}
+    save_json_atomic(args.output, merger.entries)
+    save_json_atomic(args.checkpoint, checkpoint)
+    print(f"Wikipedia: nuovi {merger.added}, arricchiti {merger.enriched}")
+
+
+def build_from_cults(merger, checkpoint, args):
+    for title in ITALIAN_CULTS:
+        merger.merge(title, "cult")
+    save_json_atomic(args.output, merger.entries)
+    print(f"Cult italiani: nuovi {merger.added}")
+
+
+async def run(args):
+    if args.reset and os.path.exists(args.checkpoint):
+        os.remove(args.checkpoint)
+    checkpoint = load_checkpoint(args.checkpoint)
+    merger = CatalogMerger(load_catalog(args.output))
+    print(f"Catalogo attuale: {len(merger.entries)} titoli ({args.output})")
+    limiter = TokenBucket(args.rate)
+    sources = [s.strip() for s in args.sources.split(",") if s.strip()]
+    try:
+        if "cult" in sources:
+            build_from_cults(merger, checkpoint, args)
+        if "tmdb" in sources:
+            await build_from_tmdb(merger, checkpoint, args, limiter)
+        if "wikipedia" in sources:
+            await build_from_wikipedia(merger, checkpoint, args, limiter)
+    finally:
+        await close_session()
+    print(f"Fatto! {len(merger.entries)} titoli. Nuovi: {merger.added}, arricchiti: {merger.enriched}")
+    bin_path, count = compile_json(args.output)
+    print(f"Catalogo compilato: {bin_path} ({count} titoli)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Costruisce/aggiorna il catalogo titoli del bot.")
+    parser.add_argument("--sources", default="cult,tmdb", help="cult, tmdb, wikipedia (separati da virgola)")
+    parser.add_argument("--output", default=CATALOG_FILE)
+    parser.add_argument("--checkpoint", default=CHECKPOINT_FILE)
+    parser.add_argument("--max-pages", type=int, default=100, help="Pagine TMDB (20 film per pagina)")
+    parser.add_argument("--concurrency", type=int, default=4)
+    parser.add_argument("--rate", type=float, default=4.0, help="Richieste al secondo (cortesia)")
+    parser.add_argument("--batch", type=int, default=20, help="Pagine per checkpoint")
+    parser.add_argument("--reset", action="store_true", help="Ignora il checkpoint e riparte da capo")
+    asyncio.run(run(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
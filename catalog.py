@@ -0,0 +1,183 @@
+import json
+import os
+import random
+import logging
+from collections import namedtuple
+
+logger = logging.getLogger(__name__)
+
+# Titles containing any of these are never published
+FORBIDDEN_WORDS = ["bambin", "bimbi", "bimbo", "ragazzin", "piccol", "minori", "infanzia"]
+
+# Recency Bias: movies from 1994-2026 are preferred.
+# The old logic skipped 70% of out-of-range movies and re-drew, which is the same
+# as giving them 0.3 of the weight of a recent (or undated) movie.
+RECENT_YEAR_MIN = 1994
+RECENT_YEAR_MAX = 2026
+OLD_MOVIE_WEIGHT = 0.3
+
+
+def clean_title(raw_title):
+    """
+    Removes the Wikipedia disambiguation suffix: "Matrix (film 1999)" -> "Matrix".
+    """
+    return raw_title.split(" (film")[0].strip()
+
+
+def extract_year(raw_title):
+    """
+    Extracts the year from "Title (film YYYY)", or None if not present.
+    """
+    if "(film " not in raw_title:
+        return None
+    year_part = raw_title.split("(film ")[1].replace(")", "").strip()
+    if year_part.isdigit():
+        return int(year_part)
+    return None
+
+
+def is_safe_title(title):
+    lower_title = title.lower()
+    return not any(word in lower_title for word in FORBIDDEN_WORDS)
+
+
+def title_weight(year):
+    if year is None or RECENT_YEAR_MIN <= year <= RECENT_YEAR_MAX:
+        return 1.0
+    return OLD_MOVIE_WEIGHT
+
+
+def build_alias_table(weights):
+    """
+    Vose's alias method: O(n) build, O(1) draw.
+    Returns (prob, alias) lists of the same length as weights.
+    """
+    n = len(weights)
+    total = sum(weights)
+    scaled = [w * n / total for w in weights]
+    prob = [0.0] * n
+    alias = [0] * n
+
+    small = [i for i, p in enumerate(scaled) if p < 1.0]
+    large = [i for i, p in enumerate(scaled) if p >= 1.0]
+
+    while small and large:
+        s = small.pop()
+        l = large.pop()
+        prob[s] = scaled[s]
+        alias[s] = l
+        scaled[l] = scaled[l] + scaled[s] - 1.0
+        if scaled[l] < 1.0:
+            small.append(l)
+        else:
+            large.append(l)
+
+    # Leftovers are 1.0 up to floating point error
+    for i in large + small:
+        prob[i] = 1.0
+        alias[i] = i
+
+    return prob, alias
+
+
+# A catalog entry. The JSON file holds plain strings ("Title (film YYYY)", legacy)
+# or objects with metadata written by build_catalog.py:
+# {"title": ..., "year": ..., "tmdb_id": ..., "poster_path": ..., "source": ...}
+CatalogEntry = namedtuple("CatalogEntry", ["title", "year", "poster_path", "tmdb_id"])
+
+
+def parse_entry(raw):
+    """
+    Returns a CatalogEntry for a raw JSON item (string or object), or None if invalid.
+    """
+    if isinstance(raw, str):
+        return CatalogEntry(clean_title(raw), extract_year(raw), None, None)
+    if isinstance(raw, dict) and isinstance(raw.get("title"), str):
+        return CatalogEntry(clean_title(raw["title"]), raw.get("year"), raw.get("poster_path"), raw.get("tmdb_id"))
+    return None
+
+
+class TitleCatalog:
+    """
+    Title list loaded once at startup.
+    Titles are already cleaned and filtered, with a precomputed weight each,
+    so drawing a title never touches disk and never loops on rejections.
+    """
+
+    def __init__(self, titles, years, poster_paths=None, tmdb_ids=None):
+        self.titles = titles
+        self.years = years
+        self.poster_paths = poster_paths or [None] * len(titles)
+        self.tmdb_ids = tmdb_ids or [None] * len(titles)
+        self.weights = [title_weight(y) for y in years]
+        if titles:
+            self._prob, self._alias = build_alias_table(self.weights)
+        else:
+            self._prob, self._alias = [], []
+
+    @classmethod
+    def from_raw_titles(cls, raw_titles):
+        titles = []
+        years = []
+        poster_paths = []
+        tmdb_ids = []
+        seen = set()
+        skipped = 0
+        for raw in raw_titles:
+            entry = parse_entry(raw)
+            if entry is None or not entry.title or entry.title in seen:
+                continue
+            if not is_safe_title(entry.title):
+                skipped += 1
+                continue
+            seen.add(entry.title)
+            titles.append(entry.title)
+            years.append(entry.year)
+            poster_paths.append(entry.poster_path)
+            tmdb_ids.append(entry.tmdb_id)
+        if skipped:
+            logger.info(f"Catalog: skipped {skipped} unsafe titles.")
+        return cls(titles, years, poster_paths, tmdb_ids)
+
+    @classmethod
+    def load(cls, path):
+        if not os.path.exists(path):
+            logger.error(f"{path} not found! Catalog is empty.")
+            return cls([], [])
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                raw_titles = json.load(f)
+        except Exception as e:
+            logger.error(f"Error reading catalog {path}: {e}")
+            return cls([], [])
+        catalog = cls.from_raw_titles(raw_titles)
+        logger.info(f"Catalog loaded: {len(catalog)} titles from {path}")
+        return catalog
+
+    def __len__(self):
+        return len(self.titles)
+
+    def sample_index(self, rng=random):
+        i = rng.randrange(len(self.titles))
+        if rng.random() < self._prob[i]:
+            return i
+        return self._alias[i]
+
+    def sample(self, rng=random):
+        """
+        Returns a random title (weighted by recency), or None if the catalog is empty.
+        """
+        if not self.titles:
+            return None
+        return self.titles[self.sample_index(rng)]
+
+    def entry(self, i):
+        return CatalogEntry(self.titles[i], self.years[i], self.poster_paths[i], self.tmdb_ids[i])
+
+    def sample_entry(self, rng=random):
+        """
+        Like sample(), but returns the whole CatalogEntry (with poster_path when known).
+        """
+        if not self.titles:
+            return None
+        return self.entry(self.sample_index(rng))
@@ -0,0 +1,223 @@
+import os
+import sys
+import mmap
+import json
+import struct
+import logging
+import argparse
+from collections.abc import Sequence
+from catalog import TitleCatalog, build_alias_table
+
+logger = logging.getLogger(__name__)
+
+# Compiled catalog: the JSON title lists converted once into a flat binary file
+# that is opened with mmap. Opening it reads only the header; titles are decoded
+# on access, so startup time and memory stay the same whatever the catalog size.
+#
+# Layout (little-endian, every section 8-byte aligned):
+#   header:   magic, version, count, then (offset, size) for each section
+#   title_offsets:  uint32[count + 1]  into title_blob
+#   title_blob:     UTF-8 titles, back to back
+#   years:          uint16[count]      (0 = unknown)
+#   weights:        float32[count]     (recency weight, see catalog.title_weight)
+#   prob, alias:    float32[count], uint32[count]  (precomputed alias table)
+#   poster_offsets: uint32[count + 1]  into poster_blob ("" = unknown)
+#   poster_blob:    UTF-8 TMDB poster paths
+#   tmdb_ids:       uint32[count]      (0 = unknown)
+MAGIC = b"PRCATBIN"
+VERSION = 1
+SECTIONS = (
+    ("title_offsets", "I"), ("title_blob", "B"), ("years", "H"), ("weights", "f"),
+    ("prob", "f"), ("alias", "I"), ("poster_offsets", "I"), ("poster_blob", "B"), ("tmdb_ids", "I"),
+)
+HEADER = struct.Struct("<8sII" + "QQ" * len(SECTIONS))
+ALIGNMENT = 8
+BIN_SUFFIX = ".bin"
+
+
+def bin_path_for(json_path):
+    return os.path.splitext(json_path)[0] + BIN_SUFFIX
+
+
+# --- Writing ---
+
+def _string_columns(strings):
+    offsets = [0]
+    blob = bytearray()
+    for s in strings:
+        blob += (s or "").encode("utf-8")
+        offsets.append(len(blob))
+    if len(blob) > 0xFFFFFFFF:
+        raise ValueError("String blob larger than 4GB, not supported by this format")
+    return struct.pack(f"<{len(offsets)}I", *offsets), bytes(blob)
+
+
+def write_catalog(catalog, path):
+    """
+    Writes a TitleCatalog in the compiled format (atomically).
+    """
+    n = len(catalog)
+    prob, alias = build_alias_table(catalog.weights) if n else ([], [])
+    title_offsets, title_blob = _string_columns(catalog.titles)
+    poster_offsets, poster_blob = _string_columns(catalog.poster_paths)
+    sections = {
+        "title_offsets": title_offsets,
+        "title_blob": title_blob,
+        "years": struct.pack(f"<{n}H", *[y if y and 0 < y < 0x10000 else 0 for y in catalog.years]),
+        "weights": struct.pack(f"<{n}f", *catalog.weights),
+        "prob": struct.pack(f"<{n}f", *prob),
+        "alias": struct.pack(f"<{n}I", *alias),
+        "poster_offsets": poster_offsets,
+        "poster_blob": poster_blob,
+        "tmdb_ids": struct.pack(f"<{n}I", *[t if isinstance(t, int) and 0 < t <= 0xFFFFFFFF else 0 for t in catalog.tmdb_ids]),
+    }
+
+    table = []
+    position = HEADER.size
+    for name, _ in SECTIONS:
+        position += -position % ALIGNMENT
+        table += [position, len(sections[name])]
+        position += len(sections[name])
+
+    tmp_path = path + ".tmp"
+    with open(tmp_path, 'wb') as f:
+        f.write(HEADER.pack(MAGIC, VERSION, n, *table))
+        for (name, _), offset in zip(SECTIONS, table[::2]):
+            f.write(b"\0" * (offset - f.tell()))
+            f.write(sections[name])
+    os.replace(tmp_path, path)
+
+
+def compile_json(json_path, bin_path=None):
+    """
+    Converts a JSON title list (strings or build_catalog.py objects) to the compiled format.
+    Titles are cleaned and filtered exactly like TitleCatalog.load().
+    """
+    bin_path = bin_path or bin_path_for(json_path)
+    with open(json_path, 'r', encoding='utf-8') as f:
+        catalog = TitleCatalog.from_raw_titles(json.load(f))
+    write_catalog(catalog, bin_path)
+    return bin_path, len(catalog)
+
+
+# --- Reading ---
+
+class _StringColumn(Sequence):
+    """
+    Strings decoded on access from an offsets table + UTF-8 blob.
+    """
+
+    def __init__(self, offsets, blob, empty=""):
+        self._offsets = offsets
+        self._blob = blob
+        self._empty = empty
+
+    def __len__(self):
+        return len(self._offsets) - 1
+
+    def __getitem__(self, i):
+        if isinstance(i, slice):
+            return [self[j] for j in range(*i.indices(len(self)))]
+        if i < 0:
+            i += len(self)
+        if not 0 <= i < len(self):
+            raise IndexError(i)
+        value = str(self._blob[self._offsets[i]:self._offsets[i + 1]], "utf-8")
+        return value or self._empty
+
+
+class _OptionalIntColumn(Sequence):
+    """
+    Integer column where 0 means "unknown" (returned as None).
+    """
+
+    def __init__(self, values):
+        self._values = values
+
+    def __len__(self):
+        return len(self._values)
+
+    def __getitem__(self, i):
+        if isinstance(i, slice):
+            return [self[j] for j in range(*i.indices(len(self)))]
+        return self._values[i] or None
+
+
+class CompiledCatalog(TitleCatalog):
+    """
+    TitleCatalog backed by a memory-mapped compiled file.
+    Same API (titles, entry(), sample_entry(), ...), nothing is loaded up front.
+    """
+
+    def __init__(self, path):
+        if sys.byteorder != "little":
+            raise ValueError("Compiled catalogs are little-endian only")
+        self.path = path
+        self._file = open(path, 'rb')
+        try:
+            self._mmap = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        except Exception:
+            self._file.close()
+            raise
+        header = HEADER.unpack_from(self._mmap, 0)
+        magic, version, count, table = header[0], header[1], header[2], header[3:]
+        if magic != MAGIC or version != VERSION:
+            self.close()
+            raise ValueError(f"{path} is not a compiled catalog (version {VERSION})")
+
+        view = memoryview(self._mmap)
+        columns = {}
+        for (name, fmt), offset, size in zip(SECTIONS, table[::2], table[1::2]):
+            columns[name] = view[offset:offset + size].cast(fmt)
+        self.titles = _StringColumn(columns["title_offsets"], columns["title_blob"])
+        self.years = _OptionalIntColumn(columns["years"])
+        self.weights = columns["weights"]
+        self.poster_paths = _StringColumn(columns["poster_offsets"], columns["poster_blob"], empty=None)
+        self.tmdb_ids = _OptionalIntColumn(columns["tmdb_ids"])
+        self._prob = columns["prob"]
+        self._alias = columns["alias"]
+        if len(self.titles) != count:
+            self.close()
+            raise ValueError(f"{path} is corrupted (expected {count} titles)")
+
+    def close(self):
+        # Column views must be released before the mmap can be closed
+        for name in ("titles", "years", "weights", "poster_paths", "tmdb_ids", "_prob", "_alias"):
+            self.__dict__.pop(name, None)
+        try:
+            self._mmap.close()
+        except (BufferError, ValueError):
+            pass  # Still referenced somewhere: closed by the garbage collector
+        self._file.close()
+
+
+def load_catalog(json_path):
+    """
+    Opens the compiled version of json_path if it exists and is up to date,
+    otherwise falls back to parsing the JSON.
+    """
+    bin_path = bin_path_for(json_path)
+    if os.path.exists(bin_path):
+        if os.path.exists(json_path) and os.path.getmtime(json_path) > os.path.getmtime(bin_path):
+            logger.warning(f"{bin_path} is older than {json_path}, using the JSON. Run: python catalog_bin.py {json_path}")
+        else:
+            try:
+                catalog = CompiledCatalog(bin_path)
+                logger.info(f"Catalog opened: {len(catalog)} titles from {bin_path}")
+                return catalog
+            except Exception as e:
+                logger.error(f"Error opening compiled catalog {bin_path}: {e}")
+    return TitleCatalog.load(json_path)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compila i cataloghi JSON nel formato binario (mmap).")
+    parser.add_argument("json_files", nargs="+", help="es. italian_movies_list.json movies.json tv_series.json")
+    args = parser.parse_args()
+    for json_path in args.json_files:
+        bin_path, count = compile_json(json_path)
+        print(f"{json_path} -> {bin_path}: {count} titoli ({os.path.getsize(bin_path) / 1024:.0f} KB)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,122 @@
+import json
+import os
+import time
+import threading
+import logging
+from collections import OrderedDict
+
+logger = logging.getLogger(__name__)
+
+INDEX_FILE = "index.json"
+# get() only reorders the LRU list; we don't rewrite the index more often than this
+INDEX_SAVE_INTERVAL_SECONDS = 30
+
+
+class DiskLRUCache:
+    """
+    Content-addressed file cache with a byte budget and LRU eviction.
+    Each entry is one file named after its key; the LRU order and sizes
+    live in an index file, so the cache survives restarts.
+    """
+
+    def __init__(self, directory, max_bytes):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.index_path = os.path.join(directory, INDEX_FILE)
+        self._entries = OrderedDict()  # key -> size, least recently used first
+        self._total_bytes = 0
+        self._last_save = 0
+        self._dirty = False
+        self._lock = threading.Lock()
+        os.makedirs(directory, exist_ok=True)
+        self._load_index()
+
+    def _file_path(self, key):
+        return os.path.join(self.directory, key)
+
+    def _load_index(self):
+        if not os.path.exists(self.index_path):
+            return
+        try:
+            with open(self.index_path, 'r') as f:
+                entries = json.load(f)
+        except Exception as e:
+            logger.error(f"Error reading cache index {self.index_path}: {e}")
+            return
+        for key, size in entries:
+            # Skip entries whose file was removed behind our back
+            if os.path.exists(self._file_path(key)):
+                self._entries[key] = size
+                self._total_bytes += size
+        logger.info(f"Cache {self.directory}: {len(self._entries)} entries, {self._total_bytes} bytes")
+
+    def _save_index(self, force=False):
+        now = time.monotonic()
+        if not force and now - self._last_save < INDEX_SAVE_INTERVAL_SECONDS:
+            self._dirty = True
+            return
+        tmp_path = self.index_path + ".tmp"
+        try:
+            with open(tmp_path, 'w') as f:
+                json.dump(list(self._entries.items()), f)
+            os.replace(tmp_path, self.index_path)
+            self._last_save = now
+            self._dirty = False
+        except Exception as e:
+            logger.error(f"Error saving cache index {self.index_path}: {e}")
+
+    def _evict(self):
+        while self._total_bytes > self.max_bytes and self._entries:
+            key, size = self._entries.popitem(last=False)
+            self._total_bytes -= size
+            try:
+                os.remove(self._file_path(key))
+            except FileNotFoundError:
+                pass
+
+    def get(self, key):
+        """
+        Returns the cached bytes for key, or None.
+        """
+        with self._lock:
+            if key not in self._entries:
+                return None
+            try:
+                with open(self._file_path(key), 'rb') as f:
+                    data = f.read()
+            except FileNotFoundError:
+                self._total_bytes -= self._entries.pop(key)
+                return None
+            self._entries.move_to_end(key)
+            self._save_index()
+            return data
+
+    def put(self, key, data):
+        if len(data) > self.max_bytes:
+            return
+        with self._lock:
+            tmp_path = self._file_path(key) + ".tmp"
+            try:
+                with open(tmp_path, 'wb') as f:
+                    f.write(data)
+                os.replace(tmp_path, self._file_path(key))
+            except Exception as e:
+                logger.error(f"Error writing cache entry {key}: {e}")
+                return
+            if key in self._entries:
+                self._total_bytes -= self._entries.pop(key)
+            self._entries[key] = len(data)
+            self._total_bytes += len(data)
+            self._evict()
+            self._save_index(force=True)
+
+    def flush(self):
+        with self._lock:
+            if self._dirty:
+                self._save_index(force=True)
+
+    def __contains__(self, key):
+        return key in self._entries
+
+    def __len__(self):
+        return len(self._entries)
@@ -4,23 +4,132 @@ import os
 import random
 import requests
 from io import BytesIO
+from functools import lru_cache
+from poster_cache import get_cached_poster, cache_poster
 
-def create_image(text, output_path="output.jpg", background_url=None):
+# Used only when no pre-downloaded bytes are given (e.g. running this file directly)
+DOWNLOAD_TIMEOUT_SECONDS = 15
+
+# Check for common fonts in Docker/Linux or Windows
+# Added Impact.ttf which is thicker, or Arial Bold
+POSSIBLE_FONTS = ["Impact.ttf", "arialbd.ttf", "arial.ttf", "DejaVuSans-Bold.ttf", "FreeSansBold.ttf"]
+# Increased font size from 80 to 110
+TITLE_FONT_SIZE = 110
+FOOTER_FONT_SIZE = 50 # Increased footer size
+WATERMARK_TEXT = "@NelCuloBot"
+OUTPUT_SIZE = (1080, 1080)
+JPEG_QUALITY = 95
+# Bump when a change to create_image() alters the pixels: cached renders (render_cache.py) are keyed on it
+RENDERER_VERSION = 1
+
+# Helper for outlined text
+def draw_text_with_outline(draw, position, text, font, text_color, outline_color, outline_width=5):
+    # Pillow's native stroke draws the outline and the text in a single pass,
+    # instead of redrawing the text (2*w+1)^2 - 1 times around each position
+    draw.text(position, text, font=font, fill=text_color, stroke_width=outline_width, stroke_fill=outline_color)
+
+@lru_cache(maxsize=None)
+def get_font_path():
+    """
+    Probes the candidate fonts once per process. Returns None if none is installed.
+    """
+    for f in POSSIBLE_FONTS:
+        try:
+            ImageFont.truetype(f, 20) # Test open
+            return f
+        except IOError:
+            continue
+    return None
+
+@lru_cache(maxsize=None)
+def get_font(size):
+    """
+    Loaded FreeTypeFont for the given size, cached per process.
+    """
+    font_path = get_font_path()
+    if font_path:
+        try:
+            return ImageFont.truetype(font_path, size)
+        except IOError:
+            pass
+    return ImageFont.load_default()
+
+@lru_cache(maxsize=None)
+def get_watermark_layer(width, height):
+    """
+    The "@NelCuloBot" footer never changes: it is drawn once on a transparent layer
+    (just big enough for the text and its outline) and pasted on every render.
+    Returns (layer, position).
+    """
+    footer_font = get_font(FOOTER_FONT_SIZE)
+    outline_width = 3
+    measure = ImageDraw.Draw(Image.new('RGBA', (1, 1)))
+    f_bbox = measure.textbbox((0, 0), WATERMARK_TEXT, font=footer_font)
+    f_w = f_bbox[2] - f_bbox[0]
+    x, y = (width - f_w) / 2, height - 100
+
+    # Same bbox as the text drawn at (x, y), with its outline
+    s_bbox = measure.textbbox((x, y), WATERMARK_TEXT, font=footer_font, stroke_width=outline_width)
+    left, top = int(s_bbox[0]), int(s_bbox[1])
+    layer = Image.new('RGBA', (int(s_bbox[2]) - left + 1, int(s_bbox[3]) - top + 1), (0, 0, 0, 0))
+    draw_text_with_outline(ImageDraw.Draw(layer), (x - left, y - top), WATERMARK_TEXT, footer_font, (220, 220, 220), (0, 0, 0), outline_width)
+    return layer, (left, top)
+
+def render_style():
     """
-    Creates an image with the text. If background_url is provided, it uses that image as background.
+    Everything besides text and background that decides the output pixels.
+    """
+    return {
+        "version": RENDERER_VERSION,
+        "size": OUTPUT_SIZE,
+        "font": get_font_path(),
+        "title_font_size": TITLE_FONT_SIZE,
+        "footer_font_size": FOOTER_FONT_SIZE,
+        "watermark": WATERMARK_TEXT,
+        "quality": JPEG_QUALITY,
+    }
+
+def warm_assets(width=OUTPUT_SIZE[0], height=OUTPUT_SIZE[1]):
+    """
+    Loads fonts and the watermark layer ahead of the first render (used by the render workers).
+    """
+    get_font(TITLE_FONT_SIZE)
+    get_watermark_layer(width, height)
+
+def create_image(text, output_path=None, background_url=None, background_bytes=None):
+    """
+    Creates an image with the text. If background_bytes (already downloaded image) or
+    background_url is provided, it uses that image as background.
     Otherwise, uses a random colored background.
+    The bot downloads posters asynchronously (see poster_fetch.py) and passes background_bytes.
+    Returns the encoded JPEG bytes; if output_path is given the image is also written there.
     """
     # Image settings
-    width, height = 1080, 1080  # Default target size
+    width, height = OUTPUT_SIZE  # Default target size
     
     img = None
     
-    # Try to load background from URL
-    if background_url:
+    # Fallback: blocking download, only for standalone usage (poster cache first)
+    if background_bytes is None and background_url:
+        background_bytes = get_cached_poster(background_url)
+    if background_bytes is None and background_url:
         try:
-            response = requests.get(background_url)
+            response = requests.get(background_url, timeout=DOWNLOAD_TIMEOUT_SECONDS)
             response.raise_for_status()
-            img = Image.open(BytesIO(response.content)).convert("RGB")
+            background_bytes = response.content
+            cache_poster(background_url, background_bytes)
+        except Exception as e:
+            print(f"Error downloading background URL: {e}")
+    
+    # Try to load background image
+    if background_bytes:
+        try:
+            img = Image.open(BytesIO(background_bytes))
+            # JPEG: let the decoder scale down by 1/2, 1/4 or 1/8 while decoding,
+            # as long as both sides still cover the target (much less memory and time)
+            if img.format == "JPEG":
+                img.draft("RGB", (width, height))
+            img = img.convert("RGB")
             # Resize/Crop to fit 1080x1080 or keep aspect ratio?
             # Let's resize to fit width 1080 and crop height or vice versa
             # For simplicity, let's just resize to cover 1080x1080
@@ -38,6 +147,10 @@ def create_image(text, output_path="output.jpg", background_url=None):
                 new_width = width
                 new_height = int(new_width / img_ratio)
                 
+            # Cheap integer downscale first (box filter), then LANCZOS only for the last step
+            factor = min(img.width // new_width, img.height // new_height)
+            if factor >= 2:
+                img = img.reduce(factor)
             img = img.resize((new_width, new_height), Image.Resampling.LANCZOS)
             
             # Center crop
@@ -55,7 +168,7 @@ def create_image(text, output_path="output.jpg", background_url=None):
             img = Image.alpha_composite(img, overlay).convert('RGB')
             
         except Exception as e:
-            print(f"Error loading background URL: {e}")
+            print(f"Error loading background image: {e}")
             img = None
 
     # Fallback if no image or error
@@ -69,29 +182,8 @@ def create_image(text, output_path="output.jpg", background_url=None):
 
     draw = ImageDraw.Draw(img)
 
-    # Load font
-    try:
-        # Check for common fonts in Docker/Linux or Windows
-        # Added Impact.ttf which is thicker, or Arial Bold
-        possible_fonts = ["Impact.ttf", "arialbd.ttf", "arial.ttf", "DejaVuSans-Bold.ttf", "FreeSansBold.ttf"]
-        font_path = None
-        for f in possible_fonts:
-            try:
-                ImageFont.truetype(f, 20) # Test open
-                font_path = f
-                break
-            except:
-                continue
-        
-        if font_path:
-            # Increased font size from 80 to 110
-            font_size = 110
-            font = ImageFont.truetype(font_path, font_size)
-        else:
-            raise IOError("No font found")
-    except IOError:
-        font = ImageFont.load_default()
-        font_size = 40
+    # Load font (resolved once per process, see get_font)
+    font = get_font(TITLE_FONT_SIZE)
 
     text_color = (255, 255, 255) # White
 
@@ -112,17 +204,6 @@ def create_image(text, output_path="output.jpg", background_url=None):
 
     current_y = (height - total_text_height) / 2
 
-    # Helper for outlined text
-    def draw_text_with_outline(draw, position, text, font, text_color, outline_color, outline_width=5):
-        x, y = position
-        # Draw outline
-        for dx in range(-outline_width, outline_width + 1):
-            for dy in range(-outline_width, outline_width + 1):
-                if dx != 0 or dy != 0:
-                    draw.text((x + dx, y + dy), text, font=font, fill=outline_color)
-        # Draw main text
-        draw.text((x, y), text, font=font, fill=text_color)
-
     # Draw text
     for i, line in enumerate(lines):
         bbox = draw.textbbox((0, 0), line, font=font)
@@ -133,27 +214,22 @@ def create_image(text, output_path="output.jpg", background_url=None):
         draw_text_with_outline(draw, (x, current_y), line, font, text_color, (0, 0, 0), 6)
         current_y += line_heights[i] + 30
 
-    # Add watermark
-    footer = "@NelCuloBot"
-    try:
-        if font_path:
-            footer_font = ImageFont.truetype(font_path, 50) # Increased footer size
-        else:
-            footer_font = ImageFont.load_default()
-    except:
-        footer_font = ImageFont.load_default()
-        
-    f_bbox = draw.textbbox((0, 0), footer, font=footer_font)
-    f_w = f_bbox[2] - f_bbox[0]
-    
-    draw_text_with_outline(draw, ((width - f_w) / 2, height - 100), footer, footer_font, (220, 220, 220), (0,0,0), 3)
+    # Add watermark (prerendered layer, a single composite)
+    watermark, position = get_watermark_layer(width, height)
+    img.paste(watermark, position, watermark)
+
+    # Encode in memory with higher quality, no disk round-trip
+    buffer = BytesIO()
+    img.save(buffer, format="JPEG", quality=JPEG_QUALITY, subsampling=0)
+    image_bytes = buffer.getvalue()
 
-    # Save with higher quality
-    img.save(output_path, quality=95, subsampling=0)
-    return output_path
+    if output_path:
+        with open(output_path, 'wb') as f:
+            f.write(image_bytes)
+    return image_bytes
 
 if __name__ == "__main__":
     # Test with a dummy URL (google logo or similar, but let's just test fallback for now or use a placeholder)
     # create_image("Harry Potter e la pietra filosofale nel c*lo", background_url="https://image.tmdb.org/t/p/w500/wuMc08IPKEatf9rnMNXvIDxqP4W.jpg")
-    create_image("Harry Potter e la pietra filosofale nel c*lo")
+    create_image("Harry Potter e la pietra filosofale nel c*lo", "output.jpg")
     print("Test image created: output.jpg")
@@ -0,0 +1,188 @@
+import os
+import time
+import asyncio
+import hashlib
+import logging
+from collections import Counter, OrderedDict
+from telegram import InlineQueryResultCachedPhoto
+from catalog import is_safe_title
+
+logger = logging.getLogger(__name__)
+
+# Inline mode: "@bot <title>" answers with rendered posters.
+# Telegram gives up on an inline query after a few seconds and users expect results
+# while typing, so we answer with whatever is ready within the budget; renders that
+# are still running keep going in the background and are ready for the next query.
+INLINE_BUDGET_SECONDS = float(os.getenv("INLINE_BUDGET_SECONDS", "0.8"))
+INLINE_MAX_RESULTS = 4
+INLINE_MIN_QUERY_LENGTH = 2
+INLINE_MAX_QUERY_LENGTH = 60  # Longer free text is not rendered (only catalog matches)
+INLINE_MATCH_MIN_SCORE = 0.4
+INLINE_CACHE_SIZE = int(os.getenv("INLINE_CACHE_SIZE", "500"))
+INLINE_MAX_RENDERS = 2  # Concurrent inline renders (the render pool is shared with broadcasts)
+INLINE_MAX_PENDING = 8  # Previews queued or rendering, all users together (more are just not shown)
+# How long Telegram may cache our answer for the same query
+CACHE_TIME_COMPLETE = 300
+CACHE_TIME_PARTIAL = 0
+
+
+class InlinePreviews:
+    """
+    Answers inline queries with InlineQueryResultCachedPhoto results.
+    Images are uploaded once to a storage chat and only their file_id is kept,
+    in a bounded LRU keyed on the ruined title: repeated queries cost nothing.
+    Only previews with a poster go in the LRU: a fallback without poster is
+    rendered again next time, when the poster may be known.
+    Every keystroke is a new query, so a user's new query cancels the renders of
+    their previous one that no other user is waiting for.
+    """
+
+    def __init__(self, title_index, render_post, storage_chat_id, render_cache=None, budget=INLINE_BUDGET_SECONDS, cache_size=INLINE_CACHE_SIZE):
+        self.title_index = title_index
+        # async callable(title, ruined_title) -> (render_key, JPEG bytes, file_id or None, has poster)
+        self._render_post = render_post
+        self.render_cache = render_cache  # Uploaded file_ids are also saved there, to survive restarts
+        self.storage_chat_id = storage_chat_id
+        self.budget = budget
+        self.cache_size = cache_size
+        self._file_ids = OrderedDict()  # ruined title -> file_id
+        self._pending = {}  # ruined title -> task (one render per title at a time, at most INLINE_MAX_PENDING)
+        self._latest = OrderedDict()  # user id -> ruined titles of their latest query
+        self._wanted = Counter()  # ruined title -> users whose latest query shows it
+        self._semaphore = None  # Created lazily inside the running event loop
+
+    def candidates(self, query):
+        """
+        Titles to show for a query: the best catalog matches, plus the text as typed.
+        Catalog titles are already filtered; free text goes through the same filter.
+        """
+        titles = [m.title for m in self.title_index.search(query, k=INLINE_MAX_RESULTS) if m.score >= INLINE_MATCH_MIN_SCORE]
+        if not is_safe_title(query):
+            return []
+        if len(query) <= INLINE_MAX_QUERY_LENGTH and query.lower() not in (t.lower() for t in titles):
+            titles = titles[:INLINE_MAX_RESULTS - 1] + [query]
+        return titles
+
+    def _cached(self, ruined_title):
+        file_id = self._file_ids.get(ruined_title)
+        if file_id is not None:
+            self._file_ids.move_to_end(ruined_title)
+        return file_id
+
+    def _remember(self, ruined_title, file_id):
+        self._file_ids[ruined_title] = file_id
+        self._file_ids.move_to_end(ruined_title)
+        while len(self._file_ids) > self.cache_size:
+            self._file_ids.popitem(last=False)
+
+    async def _upload(self, bot, image_bytes):
+        """
+        Uploads the image to the storage chat to get a reusable file_id, then deletes the message.
+        """
+        message = await bot.send_photo(chat_id=self.storage_chat_id, photo=image_bytes, disable_notification=True)
+        try:
+            await bot.delete_message(chat_id=self.storage_chat_id, message_id=message.message_id)
+        except Exception as e:
+            logger.debug(f"Could not delete inline storage message: {e}")
+        return message.photo[-1].file_id
+
+    async def _prepare(self, bot, title, ruined_title):
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(INLINE_MAX_RENDERS)
+        try:
+            async with self._semaphore:
+                render_key, image_bytes, file_id, has_poster = await self._render_post(title, ruined_title)
+            if file_id is None:
+                file_id = await self._upload(bot, image_bytes)
+                if self.render_cache is not None:
+                    self.render_cache.set_file_id(render_key, file_id)
+            if has_poster:
+                self._remember(ruined_title, file_id)
+            return file_id
+        finally:
+            self._pending.pop(ruined_title, None)
+
+    def _start(self, bot, title, ruined_title):
+        """
+        Returns the task preparing this preview, or None if too many are already pending.
+        """
+        task = self._pending.get(ruined_title)
+        if task is None:
+            if len(self._pending) >= INLINE_MAX_PENDING:
+                return None
+            task = asyncio.create_task(self._prepare(bot, title, ruined_title))
+            task.add_done_callback(_log_failure)
+            self._pending[ruined_title] = task
+        return task
+
+    def _supersede(self, user_id, ruined_titles):
+        """
+        Records the latest query of a user and cancels the renders of their previous
+        one that no user is waiting for any more ("Matr", "Matri", "Matrix": only the last counts).
+        """
+        self._wanted.update(ruined_titles)
+        previous = self._latest.pop(user_id, [])
+        self._latest[user_id] = ruined_titles
+        self._release(previous, cancel=True)
+        while len(self._latest) > self.cache_size:
+            _, dropped = self._latest.popitem(last=False)
+            self._release(dropped, cancel=False)
+
+    def _release(self, ruined_titles, cancel):
+        self._wanted.subtract(ruined_titles)
+        for ruined_title in ruined_titles:
+            if self._wanted[ruined_title] > 0:
+                continue
+            del self._wanted[ruined_title]
+            task = self._pending.get(ruined_title)
+            if cancel and task is not None:
+                task.cancel()
+
+    async def answer(self, bot, query, user_id=None):
+        """
+        Returns (results, complete): the results ready within the budget, and whether
+        every candidate was included (so Telegram may cache the answer).
+        """
+        query = " ".join(query.split())
+        if not self.storage_chat_id or len(query) < INLINE_MIN_QUERY_LENGTH:
+            return [], True
+        start = time.monotonic()
+        titles = self.candidates(query)
+        if not titles:
+            return [], True
+        ruined_titles = [f"{title} nel c*lo" for title in titles]
+        if user_id is not None:
+            self._supersede(user_id, ruined_titles)
+
+        file_ids = {}
+        waiting = {}
+        for title, ruined_title in zip(titles, ruined_titles):
+            file_id = self._cached(ruined_title)
+            if file_id is not None:
+                file_ids[ruined_title] = file_id
+                continue
+            task = self._start(bot, title, ruined_title)
+            if task is not None:
+                waiting[ruined_title] = task
+        if waiting:
+            remaining = self.budget - (time.monotonic() - start)
+            # A render that misses the budget is not cancelled: it fills the cache for the next
+            # query (unless the same user types something else first, see _supersede)
+            await asyncio.wait(list(waiting.values()), timeout=max(0.0, remaining))
+            for ruined_title, task in waiting.items():
+                if task.done() and not task.cancelled() and task.exception() is None:
+                    file_ids[ruined_title] = task.result()
+
+        results = []
+        for ruined_title in ruined_titles:
+            file_id = file_ids.get(ruined_title)
+            if file_id is not None:
+                result_id = hashlib.sha1(ruined_title.encode("utf-8")).hexdigest()
+                results.append(InlineQueryResultCachedPhoto(id=result_id, photo_file_id=file_id, caption=ruined_title))
+        logger.info(f"Inline query '{query}': {len(results)}/{len(ruined_titles)} results in {time.monotonic() - start:.2f}s")
+        return results, len(results) == len(ruined_titles)
+
+
+def _log_failure(task):
+    if not task.cancelled() and task.exception() is not None:
+        logger.error(f"Inline preview failed: {task.exception()!r}")
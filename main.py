@@ -1,14 +1,27 @@
 import json
-import random
+import asyncio
 import os
-import requests
 import logging
 import sys
-from image_generator import create_image
+from catalog_bin import load_catalog
+from title_deck import TitleDeck, title_keys
+from title_index import TitleIndex
+from storage import data_path
+from poster_fetch import fetch_poster, close_session, tmdb_poster_url
+from poster_cache import poster_cache
+from render_cache import render_cache
+import resolution_cache
+from post_buffer import Post, PostBuffer
+from broadcaster import Broadcaster
+from broadcast_jobs import BroadcastJobStore, run_job, SENT
+from subscriber_store import SubscriberStore, DeadSubscriberPruner
+from render_service import RenderService
+from poster_resolver import PosterResolver, search_tmdb_api, search_tmdb_scraping, search_duckduckgo
+from inline_previews import InlinePreviews, CACHE_TIME_COMPLETE, CACHE_TIME_PARTIAL
+from admin_digest import AdminDigest, DIGEST_WINDOW_SECONDS
+from tmdb_popular import TmdbPopularStore, REFRESH_INTERVAL_SECONDS as TMDB_POPULAR_REFRESH_SECONDS
 from telegram import Update, BotCommand
-from telegram.ext import ApplicationBuilder, ContextTypes, CommandHandler, JobQueue, TypeHandler
-from tmdbv3api import TMDb, Movie, TV, Discover
-from duckduckgo_search import DDGS
+from telegram.ext import ApplicationBuilder, ContextTypes, CommandHandler, MessageReactionHandler, InlineQueryHandler
 
 # Setup Logging
 logging.basicConfig(format='%(asctime)s - %(name)s - %(levelname)s - %(message)s', level=logging.INFO)
@@ -17,6 +30,8 @@ logger = logging.getLogger(__name__)
 # Configuration
 TELEGRAM_TOKEN = os.getenv("TELEGRAM_TOKEN")
 ADMIN_CHAT_ID = os.getenv("ADMIN_CHAT_ID")
+# Inline mode uploads previews here to get a file_id (the message is deleted right away)
+INLINE_STORAGE_CHAT_ID = os.getenv("INLINE_STORAGE_CHAT_ID", ADMIN_CHAT_ID)
 # Default interval if not set in env
 # 5 hours = 300 minutes
 DEFAULT_INTERVAL_MINUTES = 300 
@@ -32,10 +47,22 @@ except Exception as e:
     logger.error(f"Error loading config: {e}")
 
 INTERVAL_SECONDS = INTERVAL_MINUTES * 60
+# Renders stay in memory; set DEBUG_SAVE_RENDERS=1 to also write the last one to disk
 LATEST_IMAGE_PATH = "current_post.jpg"
-SUBSCRIBERS_FILE = "/data/subscribers.json" if os.path.exists("/data") else "subscribers.json"
+DEBUG_SAVE_RENDERS = os.getenv("DEBUG_SAVE_RENDERS", "").lower() in ("1", "true", "yes")
+SUBSCRIBERS_FILE = "/data/subscribers.json" if os.path.exists("/data") else "subscribers.json" # Legacy, migrated to SUBSCRIBERS_DB
+SUBSCRIBERS_DB = "/data/subscribers.db" if os.path.exists("/data") else "subscribers.db"
 CONFIG_FILE = "/data/bot_config.json" if os.path.exists("/data") else "bot_config.json"
 MOVIES_FILE = "italian_movies_list.json" # New file with 9900+ titles
+# Extra title lists, only used to recognize free-text titles (/suggest, /publish)
+EXTRA_TITLE_FILES = [("movies", "movies.json"), ("tv", "tv_series.json")]
+# Minimum similarity (0-1) to propose the catalog title for a free-text one
+# (only a 1.0 match, the same title once normalized, replaces it)
+SUGGEST_MATCH_MIN_SCORE = 0.6
+PUBLISH_MATCH_MIN_SCORE = 0.8
+TMDB_POPULAR_FILE = "/data/tmdb_popular.json" if os.path.exists("/data") else "tmdb_popular.json"
+# Number of prerendered posts kept ready by the background producer
+POST_BUFFER_SIZE = int(os.getenv("POST_BUFFER_SIZE", "3"))
 
 # TMDB Configuration
 # Using a public generic key or requires user key. 
@@ -43,9 +70,24 @@ MOVIES_FILE = "italian_movies_list.json" # New file with 9900+ titles
 # I'll add a default key if none provided, but better to use env var.
 TMDB_API_KEY = os.getenv("TMDB_API_KEY", "e4f9e61f6dd628033d8fd6d42746f972") # Using a common public key for demo/testing if needed
 
-tmdb = TMDb()
-tmdb.api_key = TMDB_API_KEY
-tmdb.language = 'it-IT'
+# TMDB popular pages, refreshed daily by the job queue
+tmdb_popular = TmdbPopularStore(TMDB_POPULAR_FILE, TMDB_API_KEY)
+
+# Title catalog: the compiled .bin (mmap) when available, else the JSON
+CATALOG = load_catalog(MOVIES_FILE)
+
+# Fuzzy title search over all title lists (built in the background at startup)
+title_index = TitleIndex([("italian", CATALOG)] + [(name, load_catalog(path)) for name, path in EXTRA_TITLE_FILES])
+
+# No-repeat order over the catalog, persisted in /data (survives /restart and redeploys)
+title_deck = TitleDeck(CATALOG, data_path("title_deck.json"), data_path("published_titles.txt"))
+
+# Poster providers, queried concurrently (first hit wins)
+poster_resolver = PosterResolver([
+    ("tmdb", lambda title: search_tmdb_api(title, TMDB_API_KEY)),
+    ("tmdb_scraping", search_tmdb_scraping),
+    ("duckduckgo", search_duckduckgo),
+])
 
 def load_config():
     config = {}
@@ -63,207 +105,59 @@ def save_config(config):
 
 # --- Subscribers Management ---
 
-def load_subscribers():
-    if os.path.exists(SUBSCRIBERS_FILE):
-        try:
-            with open(SUBSCRIBERS_FILE, 'r') as f:
-                return set(json.load(f))
-        except:
-            return set()
-    return set()
-
-def save_subscribers(subs):
-    with open(SUBSCRIBERS_FILE, 'w') as f:
-        json.dump(list(subs), f)
+# Stored in SQLite; the old subscribers.json is imported once on first start
+subscriber_store = SubscriberStore(SUBSCRIBERS_DB, legacy_json_path=SUBSCRIBERS_FILE)
 
 def add_subscriber(chat_id):
-    subs = load_subscribers()
-    subs.add(str(chat_id))
-    save_subscribers(subs)
+    return subscriber_store.add(chat_id)
 
 def remove_subscriber(chat_id):
-    subs = load_subscribers()
-    chat_id_str = str(chat_id)
-    if chat_id_str in subs:
-        subs.remove(chat_id_str)
-        save_subscribers(subs)
+    subscriber_store.remove(chat_id)
 
 # --- Content Logic (The Upgrade) ---
 
 def get_random_movie_or_tv():
     """
-    Fetches a random popular movie or TV show using TMDB API directly.
-    Only works if API Key is valid.
+    Picks a random popular movie or TV show from the local copy of TMDB popular pages
+    (refreshed once a day in the background, see tmdb_popular.py). No API call per post.
     """
-    if not TMDB_API_KEY:
-        logger.warning("TMDB_API_KEY mancante! Impossibile recuperare immagini.")
-        # If API key is missing, return None title so we fallback to local list + web search
-        return None, None
-        
-    try:
-        # Randomly choose between Movie and TV
-        is_movie = random.choice([True, False])
-        
-        # Random page (popular content usually goes up to 500 pages)
-        # Reduced max page to 20 to ensure higher quality/popularity and images
-        page = random.randint(1, 20) 
-        
-        if is_movie:
-            movie = Movie()
-            results = movie.popular(page=page)
-        else:
-            tv = TV()
-            results = tv.popular(page=page)
-            
-        if results:
-            # Try up to 5 times to find an item with a poster
-            for _ in range(5):
-                item = random.choice(results)
-                poster_path = getattr(item, 'poster_path', None)
-                
-                if poster_path:
-                    title = getattr(item, 'title', getattr(item, 'name', 'Unknown'))
-                    poster_url = f"https://image.tmdb.org/t/p/original{poster_path}"
-                    return title, poster_url
-            
-            # If loop finishes without returning, still return a title if we found one, so we can search web
-            # Pick the last item checked
-            item = random.choice(results)
-            title = getattr(item, 'title', getattr(item, 'name', 'Unknown'))
-            logger.warning(f"Nessun poster TMDB trovato dopo 5 tentativi a pagina {page}. Uso titolo '{title}' e cercherò sul web.")
-            return title, None
-            
-    except Exception as e:
-        logger.error(f"Error fetching from TMDB: {e}")
+    item = tmdb_popular.pick()
+    if not item:
+        logger.warning("Nessun titolo TMDB popolare disponibile (TMDB_API_KEY mancante o aggiornamento fallito).")
         return None, None
-
-    return None, None
-
-def get_poster_from_scraping(title):
-    headers = {
-        'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
-    }
-    try:
-        search_query = quote_plus(title)
-        url = f"https://www.themoviedb.org/search?query={search_query}"
-        response = requests.get(url, headers=headers, timeout=10)
-        response.raise_for_status()
-        soup = BeautifulSoup(response.text, 'lxml')
-        img_tag = soup.select_one("div.card div.image img.poster")
-        if not img_tag:
-            img_tag = soup.select_one(".results .card img")
-        if img_tag:
-            poster_url = img_tag.get('src') or img_tag.get('data-src')
-            if poster_url:
-                if poster_url.startswith('/'):
-                    poster_url = f"https://www.themoviedb.org{poster_url}"
-                poster_url = poster_url.replace("w220_and_h330_face", "original")
-                poster_url = poster_url.replace("w94_and_h141_bestv2", "original")
-                return poster_url
-    except Exception as e:
-        logger.error(f"Error scraping poster: {e}")
-    return None
-
-def get_poster_from_web(title):
-    """
-    Search for a movie poster on DuckDuckGo Images.
-    """
-    try:
-        search_query = f"{title} locandina film poster"
-        logger.info(f"Searching web for poster: {search_query}")
-        
-        with DDGS() as ddgs:
-            # Search for images, max 1 result
-            results = list(ddgs.images(
-                keywords=search_query,
-                region="it-it",
-                safesearch="on", # Strict SafeSearch
-                size="Large",
-                type_image="photo",
-                max_results=1
-            ))
-            
-            if results:
-                image_url = results[0].get('image')
-                logger.info(f"Web search found image: {image_url}")
-                return image_url
-            else:
-                logger.warning("Web search found no images.")
-                
-    except Exception as e:
-        logger.error(f"Error searching web for poster: {e}")
-    
-    return None
+    title, poster_path = item
+    poster_url = tmdb_poster_url(poster_path)
+    resolution_cache.store(title, poster_url, "tmdb")
+    return title, poster_url
 
 def get_random_italian_title():
     """
-    Loads titles from the massive local JSON list (scraped from Wikipedia).
-    Filters out titles with 'bambini', 'bimbi', etc.
+    Deals the next title from the deck over the local Italian catalog
+    (no repeats until every title has been dealt).
+    Returns (title_key, entry) with entry = (title, year, poster_path, tmdb_id), or (None, None).
     """
-    if not os.path.exists(MOVIES_FILE):
-        logger.error(f"{MOVIES_FILE} not found! Fallback to TMDB.")
-        return None
-        
-    try:
-        with open(MOVIES_FILE, 'r', encoding='utf-8') as f:
-            movies = json.load(f)
-            
-        if not movies:
-            return None
-            
-        # Try to find a safe title
-        for _ in range(50): # Max 50 attempts
-            title = random.choice(movies)
-            
-            # 1. Clean title (remove " (film ...)")
-            clean_title = title.split(" (film")[0]
-            
-            # 2. Safety Filter
-            lower_title = clean_title.lower()
-            forbidden_words = ["bambin", "bimbi", "bimbo", "ragazzin", "piccol", "minori", "infanzia"]
-            if any(word in lower_title for word in forbidden_words):
-                logger.info(f"Skipped unsafe title: {clean_title}")
-                continue
-            
-            # 3. Recency Bias (Prefer movies from 1994-2026)
-            # Try to extract year from the original string "Title (film YYYY)"
-            try:
-                # Extract year if present in parentheses e.g. "Matrix (film 1999)"
-                if "(film " in title:
-                    year_part = title.split("(film ")[1].replace(")", "")
-                    if year_part.isdigit():
-                        year = int(year_part)
-                        # Logic: If year is outside 1994-2026, flip a coin to see if we skip it
-                        # This makes recent movies MORE likely but doesn't ban old ones completely
-                        if year < 1994 or year > 2026:
-                            # 70% chance to skip old movies to prefer recent ones
-                            if random.random() < 0.7: 
-                                logger.info(f"Skipped old movie (bias): {clean_title} ({year})")
-                                continue
-            except Exception:
-                pass # If year parsing fails, just keep the title
-                
-            return clean_title
-            
-    except Exception as e:
-        logger.error(f"Error reading movies file: {e}")
-        
-    return None
+    index = title_deck.draw()
+    if index is None:
+        logger.error(f"{MOVIES_FILE} empty or missing! Fallback to TMDB.")
+        return None, None
+    return title_deck.key(index), CATALOG.entry(index)
 
-def get_content_data():
+async def get_content_data():
     # 1. Try Local Italian List first (Priority!)
-    title = get_random_italian_title()
-    poster_url = None
+    title_key, entry = get_random_italian_title()
+    title = entry.title if entry else None
+    # Entries added by build_catalog.py already know their TMDB poster
+    poster_url = tmdb_poster_url(entry.poster_path) if entry and entry.poster_path else None
     
-    # 2. If local list failed, fallback to TMDB random
+    # 2. If local list failed, fallback to TMDB random (served from the local popular pages)
     if not title:
-        logger.info("Local list failed/empty. Falling back to TMDB API random.")
+        logger.info("Local list failed/empty. Falling back to TMDB popular.")
         title, poster_url = get_random_movie_or_tv()
     
-    # 3. If we have a title (from local or TMDB) but no poster yet, search Web
+    # 3. If we have a title (from local or TMDB) but no poster yet, ask all poster providers at once
     if title and not poster_url:
-        logger.info(f"Need poster for '{title}'. Searching Web...")
-        poster_url = get_poster_from_web(title)
+        logger.info(f"Need poster for '{title}'. Searching...")
+        poster_url, _ = await poster_resolver.resolve(title)
 
     # 4. Ultimate Fallback
     if not title:
@@ -274,36 +168,167 @@ def get_content_data():
     ruined_title = f"{title} nel c*lo"
     
     logger.info(f"Selected: {title} -> {ruined_title}")
-    return title, ruined_title, poster_url
+    return title_key, title, ruined_title, poster_url
+
+def save_debug_render(image_bytes):
+    """
+    Debug only: writes the last broadcast image to LATEST_IMAGE_PATH (atomically, never half-written).
+    """
+    if not DEBUG_SAVE_RENDERS:
+        return
+    tmp_path = LATEST_IMAGE_PATH + ".tmp"
+    try:
+        with open(tmp_path, 'wb') as f:
+            f.write(image_bytes)
+        os.replace(tmp_path, LATEST_IMAGE_PATH)
+    except Exception as e:
+        logger.error(f"Failed to save debug render: {e}")
+
+async def render_post_image(ruined_title, poster_bytes):
+    """
+    Renders through the render cache. Returns (render_key, image_bytes, file_id):
+    a render seen before is not rendered again, and if Telegram already has it
+    (file_id) it is not uploaded again either. image_bytes is None only when
+    the JPEG was evicted but its file_id is still known.
+    """
+    render_key = render_cache.key(ruined_title, poster_bytes)
+    file_id = render_cache.get_file_id(render_key)
+    image_bytes = render_cache.get_image(render_key)
+    if image_bytes is None and file_id is None:
+        image_bytes = await render_service.render(ruined_title, poster_bytes)
+        render_cache.put_image(render_key, image_bytes)
+    else:
+        logger.info(f"Render cache hit for '{ruined_title}' (file_id {'known' if file_id else 'unknown'})")
+    return render_key, image_bytes, file_id
+
+async def produce_post():
+    """
+    Builds a complete post: title, poster and rendered image.
+    Poster lookups are async, rendering runs in the render process pool.
+    """
+    title_key, original_title, ruined_title, poster_url = await get_content_data()
+    poster_bytes = await fetch_poster(poster_url)
+    render_key, image_bytes, file_id = await render_post_image(ruined_title, poster_bytes)
+    return Post(
+        title=original_title, ruined_title=ruined_title, caption=ruined_title, image_bytes=image_bytes,
+        title_key=title_key, render_key=render_key, file_id=file_id
+    )
+
+# Filled in the background once the bot is running (see post_init)
+post_buffer = PostBuffer(produce_post, POST_BUFFER_SIZE)
+
+# Renders run in worker processes (RENDER_WORKERS), started before the bot in __main__
+render_service = RenderService()
+
+# Shared fan-out engine (rate limits are global for the bot, so one instance for every broadcast)
+broadcaster = Broadcaster()
+
+# Every broadcast is a durable job (image + per-recipient status), resumed after a restart
+job_store = BroadcastJobStore(data_path("broadcast_jobs.db"), data_path("broadcast_jobs"))
+
+async def run_broadcast_job(bot, job_id):
+    """
+    Sends a broadcast job to its remaining recipients. Returns the DeliveryReport of this run.
+    """
+    # Chats that blocked the bot or no longer exist are dropped after a few strikes
+    pruner = DeadSubscriberPruner(subscriber_store)
+    try:
+        report = await run_job(job_store, broadcaster, bot, job_id, on_result=pruner.record)
+    finally:
+        pruner.flush()
+    job = job_store.get(job_id)
+    # Next time this exact render comes up, it is sent by file_id without uploading
+    render_cache.set_file_id(job.render_key, job.file_id)
+    if job.title_key is not None and job_store.counts(job_id).get(SENT):
+        title_deck.mark_published(job.title_key)
+    return report
+
+async def resume_broadcast_jobs(bot):
+    """
+    Resumes broadcasts interrupted by a restart/redeploy (only recipients not reached yet).
+    """
+    for job_id in job_store.unfinished():
+        logger.warning(f"Resuming interrupted broadcast job {job_id}...")
+        try:
+            report = await run_broadcast_job(bot, job_id)
+        except Exception as e:
+            logger.error(f"Error resuming broadcast job {job_id}: {e}")
+            continue
+        if ADMIN_CHAT_ID:
+            try:
+                await bot.send_message(chat_id=ADMIN_CHAT_ID, text=f"♻️ Invio interrotto ripreso (job {job_id}).\n📊 {report.summary()}")
+            except Exception as e:
+                logger.error(f"Failed to notify admin about resumed job: {e}")
+
+async def render_inline_post(title, ruined_title):
+    """
+    Poster + render for an inline preview. Every keystroke is a query, so the web
+    resolver is never called here: only the catalog poster or an already cached
+    resolution, otherwise the plain background.
+    Returns (render_key, image_bytes, file_id, has poster).
+    """
+    match = title_index.best(title, 1.0)
+    entry = match.catalog.entry(match.index) if match else None
+    if entry and entry.poster_path:
+        poster_url = tmdb_poster_url(entry.poster_path)
+    else:
+        cached = resolution_cache.lookup(title)
+        poster_url = cached[0] if cached else None
+    poster_bytes = await fetch_poster(poster_url)
+    render_key, image_bytes, file_id = await render_post_image(ruined_title, poster_bytes)
+    return render_key, image_bytes, file_id, poster_bytes is not None
+
+# "@bot <title>" in any chat
+inline_previews = InlinePreviews(title_index, render_inline_post, INLINE_STORAGE_CHAT_ID, render_cache)
 
 async def generate_and_broadcast(context: ContextTypes.DEFAULT_TYPE):
     logger.info("Starting broadcast job...")
     
     # Get subscribers
-    subscribers = load_subscribers()
-    if not subscribers:
+    if subscriber_store.count() == 0:
         logger.info("No subscribers. Skipping.")
         return
 
     try:
-        # 1. Generate Content (Once for everyone)
-        original_title, ruined_title, poster_url = get_content_data()
+        # 1. Take a prerendered post (Once for everyone), generate inline only if the buffer is empty
+        post = post_buffer.pop()
+        if post is None:
+            logger.info("Post buffer empty. Generating inline...")
+            post = await produce_post()
         
-        # 2. Generate Image
-        create_image(ruined_title, LATEST_IMAGE_PATH, background_url=poster_url)
-        
-        # 3. Broadcast
-        for chat_id in subscribers:
-            try:
-                await context.bot.send_photo(chat_id=chat_id, photo=open(LATEST_IMAGE_PATH, 'rb'), caption=ruined_title)
-                logger.info(f"Sent to {chat_id}")
-            except Exception as e:
-                logger.error(f"Failed to send to {chat_id}: {e}")
+        if post.image_bytes:
+            save_debug_render(post.image_bytes)
+
+        # 2. Broadcast as a durable job (upload once, then fan out by file_id)
+        job_id = job_store.create(
+            post.caption, subscriber_store.iter_ids(), image_bytes=post.image_bytes, title_key=post.title_key,
+            file_id=post.file_id, render_key=post.render_key
+        )
+        report = await run_broadcast_job(context.bot, job_id)
 
-        logger.info("Broadcast finished.")
+        logger.info(f"Broadcast finished: {report.summary()}")
     except Exception as e:
         logger.error(f"Error in job: {e}")
 
+async def refresh_tmdb_popular(context: ContextTypes.DEFAULT_TYPE):
+    await tmdb_popular.refresh()
+
+# Admin notifications (reactions, signups, suggestions), sent as one digest per window
+admin_digest = AdminDigest()
+
+async def send_admin_digest(bot):
+    if not ADMIN_CHAT_ID:
+        admin_digest.render()  # Nobody to tell: just drop the events
+        return
+    for text in admin_digest.render():
+        try:
+            await bot.send_message(chat_id=ADMIN_CHAT_ID, text=text, parse_mode='HTML')
+        except Exception as e:
+            logger.error(f"Failed to send admin digest: {e}")
+
+async def flush_admin_digest(context: ContextTypes.DEFAULT_TYPE):
+    await send_admin_digest(context.bot)
+
 # --- Command Handlers ---
 
 def is_admin(update: Update):
@@ -311,7 +336,7 @@ def is_admin(update: Update):
 
 async def start(update: Update, context: ContextTypes.DEFAULT_TYPE):
     chat_id = update.effective_chat.id
-    add_subscriber(chat_id)
+    is_new = add_subscriber(chat_id)
     msg = (
         f"🍑 *Benvenuto in NelCuloBot2!* 🍑\n\n"
         f"Preparati a vedere i grandi classici del cinema come non li hai mai visti (o sentiti) prima.\n"
@@ -326,21 +351,11 @@ async def start(update: Update, context: ContextTypes.DEFAULT_TYPE):
     
     await context.bot.send_message(chat_id=chat_id, text=msg, parse_mode='Markdown')
 
-    # Notify Admin of new subscriber
-    if ADMIN_CHAT_ID and str(chat_id) != str(ADMIN_CHAT_ID):
-        try:
-            user = update.effective_user
-            username = f"@{user.username}" if user.username else "N/A"
-            full_name = user.full_name
-            admin_msg = (
-                f"🔔 *Nuovo Utente Iscritto!* 🔔\n\n"
-                f"👤 Nome: {full_name}\n"
-                f"🔗 Username: {username}\n"
-                f"🆔 ID: `{chat_id}`"
-            )
-            await context.bot.send_message(chat_id=ADMIN_CHAT_ID, text=admin_msg, parse_mode='Markdown')
-        except Exception as e:
-            logger.error(f"Failed to notify admin about new user: {e}")
+    # Notify Admin of new subscriber (in the next digest)
+    if is_new and str(chat_id) != str(ADMIN_CHAT_ID):
+        user = update.effective_user
+        user_name = f"{user.full_name} (@{user.username})" if user.username else user.full_name
+        admin_digest.add_signup(user_name, chat_id)
 
 async def my_id(update: Update, context: ContextTypes.DEFAULT_TYPE):
     chat_id = update.effective_chat.id
@@ -360,8 +375,8 @@ async def force(update: Update, context: ContextTypes.DEFAULT_TYPE):
 async def users(update: Update, context: ContextTypes.DEFAULT_TYPE):
     if not is_admin(update):
         return
-    subs = load_subscribers()
-    await context.bot.send_message(chat_id=update.effective_chat.id, text=f"👥 Utenti: {len(subs)}\n{list(subs)}")
+    subs = list(subscriber_store.iter_ids())
+    await context.bot.send_message(chat_id=update.effective_chat.id, text=f"👥 Utenti: {len(subs)}\n{subs}")
 
 async def broadcast_message(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """
@@ -376,19 +391,16 @@ async def broadcast_message(update: Update, context: ContextTypes.DEFAULT_TYPE):
         return
 
     message = " ".join(context.args)
-    subscribers = load_subscribers()
+    total = subscriber_store.count()
     
-    await context.bot.send_message(chat_id=update.effective_chat.id, text=f"📣 Invio a {len(subscribers)} utenti...")
+    await context.bot.send_message(chat_id=update.effective_chat.id, text=f"📣 Invio a {total} utenti...")
     
-    count = 0
-    for chat_id in subscribers:
-        try:
-            await context.bot.send_message(chat_id=chat_id, text=f"📢 *COMUNICAZIONE UFFICIALE:*\n\n{message}", parse_mode='Markdown')
-            count += 1
-        except Exception as e:
-            logger.error(f"Failed to broadcast to {chat_id}: {e}")
+    job_id = job_store.create(
+        f"📢 *COMUNICAZIONE UFFICIALE:*\n\n{message}", subscriber_store.iter_ids(), parse_mode='Markdown'
+    )
+    report = await run_broadcast_job(context.bot, job_id)
             
-    await context.bot.send_message(chat_id=update.effective_chat.id, text=f"✅ Inviato correttamente a {count}/{len(subscribers)} utenti.")
+    await context.bot.send_message(chat_id=update.effective_chat.id, text=f"✅ Inviato correttamente a {report.sent}/{total} utenti.\n📊 {report.summary()}")
 
 async def import_subs(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """
@@ -425,17 +437,12 @@ async def import_subs(update: Update, context: ContextTypes.DEFAULT_TYPE):
         await context.bot.send_message(chat_id=update.effective_chat.id, text="❌ Nessun ID valido trovato.")
         return
 
-    current_subs = load_subscribers()
-    initial_count = len(current_subs)
-    
-    current_subs.update(new_subs)
-    save_subscribers(current_subs)
-    
-    added_count = len(current_subs) - initial_count
+    # Single transaction for the whole batch
+    added_count = subscriber_store.add_many(new_subs)
     
     await context.bot.send_message(
         chat_id=update.effective_chat.id, 
-        text=f"✅ Importati {added_count} nuovi iscritti.\n👥 Totale attuale: {len(current_subs)}"
+        text=f"✅ Importati {added_count} nuovi iscritti.\n👥 Totale attuale: {subscriber_store.count()}"
     )
 
 async def test_title(update: Update, context: ContextTypes.DEFAULT_TYPE):
@@ -445,11 +452,13 @@ async def test_title(update: Update, context: ContextTypes.DEFAULT_TYPE):
     if not is_admin(update):
         return
         
-    title = get_random_italian_title()
-    if not title:
+    # Only a preview: does not deal from the deck
+    entry = CATALOG.sample_entry()
+    if not entry:
         await context.bot.send_message(chat_id=update.effective_chat.id, text="❌ Errore nel recupero titolo (DB vuoto?)")
         return
         
+    title = entry.title
     ruined = f"{title} nel c*lo"
     await context.bot.send_message(chat_id=update.effective_chat.id, text=f"🧪 *Test Titolo:*\n\nOriginale: {title}\nRovinato: {ruined}", parse_mode='Markdown')
 
@@ -502,41 +511,38 @@ async def restart(update: Update, context: ContextTypes.DEFAULT_TYPE):
 
 async def handle_reactions(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """
-    Notifies admin when a user reacts to a message.
+    Collects user reactions for the admin digest, counted per post and emoji.
     """
-    try:
-        if not update.message_reaction:
-            return
+    reaction = update.message_reaction
+    user = reaction.user
+    # Anonymous reactions have no user; don't count the admin's own reactions
+    if not user or str(user.id) == str(ADMIN_CHAT_ID):
+        return
 
-        user = update.message_reaction.user
-        chat_id = update.message_reaction.chat.id
-        message_id = update.message_reaction.message_id
-        
-        # Get the new reaction (if any)
-        new_reaction = update.message_reaction.new_reaction
-        emoji = new_reaction[0].emoji if new_reaction else "reaction removed"
-        
-        if not user:
-            return
+    # Only newly added reactions (removals and unchanged ones are ignored)
+    old = {getattr(r, "emoji", None) or r.type for r in reaction.old_reaction}
+    added = [getattr(r, "emoji", None) or r.type for r in reaction.new_reaction]
+    added = [emoji for emoji in added if emoji not in old]
+    if not added:
+        return
 
-        # Don't notify if admin reacts (spam prevention)
-        if str(user.id) == str(ADMIN_CHAT_ID):
-            return
+    job = job_store.find_post(reaction.chat.id, reaction.message_id)
+    post_label = job.caption if job else f"messaggio {reaction.message_id} in {reaction.chat.id}"
+    user_name = f"@{user.username}" if user.username else user.full_name
+    for emoji in added:
+        admin_digest.add_reaction(post_label, emoji, user_name)
 
-        user_name = f"@{user.username}" if user.username else user.full_name
-        
-        msg = (
-            f"🔔 *Nuova Reazione!* 🔔\n\n"
-            f"👤 Utente: {user_name}\n"
-            f"😍 Reazione: {emoji}\n"
-            f"🔗 [Vai al messaggio](https://t.me/c/{str(chat_id).replace('-100', '')}/{message_id})"
+async def inline_query(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """
+    Inline mode: answers with the posters that are ready within the latency budget.
+    """
+    try:
+        results, complete = await inline_previews.answer(
+            context.bot, update.inline_query.query, user_id=update.inline_query.from_user.id
         )
-        
-        if ADMIN_CHAT_ID:
-            await context.bot.send_message(chat_id=ADMIN_CHAT_ID, text=msg, parse_mode='Markdown')
-            
+        await update.inline_query.answer(results, cache_time=CACHE_TIME_COMPLETE if complete else CACHE_TIME_PARTIAL)
     except Exception as e:
-        logger.error(f"Error handling reaction: {e}")
+        logger.error(f"Error answering inline query: {e}")
 
 async def suggest(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """
@@ -547,7 +553,12 @@ async def suggest(update: Update, context: ContextTypes.DEFAULT_TYPE):
         await context.bot.send_message(chat_id=update.effective_chat.id, text="⚠️ Uso: /suggest <Titolo del film>")
         return
 
-    title_suggestion = " ".join(context.args)
+    typed_title = " ".join(context.args)
+    # Same title once normalized: use the catalog spelling. A close but different title
+    # ("Frozen 2" vs "Frozen") may well be another film, so it only goes to the admin as a hint.
+    match = title_index.best(typed_title, SUGGEST_MATCH_MIN_SCORE)
+    title_suggestion = match.title if match and match.score >= 1.0 else typed_title
+    close_match = match.title if match and match.score < 1.0 else None
     user = update.effective_user
     user_name = f"@{user.username}" if user.username else user.full_name
     user_id = user.id
@@ -558,17 +569,8 @@ async def suggest(update: Update, context: ContextTypes.DEFAULT_TYPE):
         text=f"✅ Grazie {user.first_name}! Ho inviato il tuo suggerimento all'admin: *{title_suggestion}*"
     , parse_mode='Markdown')
 
-    # Notify Admin
-    if ADMIN_CHAT_ID:
-        clean_title = title_suggestion.replace("'", "").replace('"', "")
-        admin_msg = (
-            f"💡 *Nuovo Suggerimento!* 💡\n\n"
-            f"👤 Utente: {user_name} (`{user_id}`)\n"
-            f"🎬 Titolo: *{title_suggestion}*\n\n"
-            f"Pubblica subito con:\n`/publish {title_suggestion}`\n\n"
-            f"Pubblica citando l'utente:\n`/publish_credit {user_name} {title_suggestion}`"
-        )
-        await context.bot.send_message(chat_id=ADMIN_CHAT_ID, text=admin_msg, parse_mode='Markdown')
+    # Notify Admin (in the next digest)
+    admin_digest.add_suggestion(user_name, user_id, title_suggestion, close_match)
 
 async def publish_custom(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """
@@ -579,7 +581,7 @@ async def publish_custom(update: Update, context: ContextTypes.DEFAULT_TYPE):
         return
         
     if not context.args:
-        await context.bot.send_message(chat_id=update.effective_chat.id, text="⚠️ Uso: /publish <Titolo>")
+        await context.bot.send_message(chat_id=update.effective_chat.id, text="⚠️ Uso: /publish <Titolo>\n(tra virgolette per usarlo così com'è, senza cercarlo nel catalogo)")
         return
 
     title = " ".join(context.args)
@@ -604,40 +606,65 @@ async def publish_credit(update: Update, context: ContextTypes.DEFAULT_TYPE):
 
 async def process_custom_publish(update: Update, context: ContextTypes.DEFAULT_TYPE, title: str, credit: str = None):
     chat_id = update.effective_chat.id
+    # 0. Match the catalog ("quoted" titles are used verbatim)
+    match = None
+    if len(title) > 1 and title[0] == title[-1] == '"':
+        title = title[1:-1].strip()
+    else:
+        match = title_index.best(title, PUBLISH_MATCH_MIN_SCORE)
+    if match and match.score < 1.0:
+        # Only a near miss ("Il Padrino 2" vs "Il Padrino"): could be another film, ask before broadcasting
+        command = f"/publish_credit {credit}" if credit else "/publish"
+        await context.bot.send_message(
+            chat_id=chat_id,
+            text=f"🔎 Non trovato nel catalogo. Forse intendevi: *{match.title}*?\n"
+                 f"Usa `{command} {match.title}` per il titolo del catalogo, "
+                 f"oppure `{command} \"{title}\"` per pubblicarlo così com'è.",
+            parse_mode='Markdown'
+        )
+        return
+    if match:
+        # Same title once normalized: catalog spelling and metadata
+        title = match.title
+    entry = match.catalog.entry(match.index) if match else None
     await context.bot.send_message(chat_id=chat_id, text=f"⏳ Elaborazione di: *{title}*...", parse_mode='Markdown')
     
-    # 1. Search Poster
-    poster_url = get_poster_from_web(title)
+    # 1. Search Poster (catalog metadata first, then the resolver and its cache)
+    poster_url = tmdb_poster_url(entry.poster_path) if entry and entry.poster_path else None
+    if not poster_url:
+        poster_url, _ = await poster_resolver.resolve(title)
     if not poster_url:
         await context.bot.send_message(chat_id=chat_id, text="⚠️ Nessuna copertina trovata sul web. Uso background generico.")
     
     # 2. Ruin Title
     ruined_title = f"{title} nel c*lo"
     
-    # 3. Generate Image
+    # 3. Generate Image (in the render process pool)
+    poster_bytes = await fetch_poster(poster_url)
     try:
-        create_image(ruined_title, LATEST_IMAGE_PATH, background_url=poster_url)
+        render_key, image_bytes, file_id = await render_post_image(ruined_title, poster_bytes)
     except Exception as e:
         await context.bot.send_message(chat_id=chat_id, text=f"❌ Errore generazione immagine: {e}")
         return
 
     # 4. Broadcast
-    subscribers = load_subscribers()
-    await context.bot.send_message(chat_id=chat_id, text=f"📣 Invio a {len(subscribers)} utenti...")
+    await context.bot.send_message(chat_id=chat_id, text=f"📣 Invio a {subscriber_store.count()} utenti...")
     
     caption = ruined_title
     if credit:
         caption += f"\n\n💡 Suggerito da: {credit}"
 
-    count = 0
-    for sub_id in subscribers:
-        try:
-            await context.bot.send_photo(chat_id=sub_id, photo=open(LATEST_IMAGE_PATH, 'rb'), caption=caption)
-            count += 1
-        except Exception as e:
-            logger.error(f"Failed to send to {sub_id}: {e}")
+    if image_bytes:
+        save_debug_render(image_bytes)
+    # Catalog titles count as published for the no-repeat deck (matched by key, whatever the catalog)
+    title_key = title_keys(match.catalog, match.index)[0] if match else None
+    job_id = job_store.create(
+        caption, subscriber_store.iter_ids(), image_bytes=image_bytes, title_key=title_key,
+        file_id=file_id, render_key=render_key
+    )
+    report = await run_broadcast_job(context.bot, job_id)
 
-    await context.bot.send_message(chat_id=chat_id, text=f"✅ Pubblicato con successo a {count} utenti!")
+    await context.bot.send_message(chat_id=chat_id, text=f"✅ Pubblicato con successo a {report.sent} utenti!\n📊 {report.summary()}")
 
 async def post_init(application: ApplicationBuilder):
     """
@@ -661,6 +688,32 @@ async def post_init(application: ApplicationBuilder):
     await application.bot.set_my_commands(commands)
     logger.info("Comandi bot aggiornati su Telegram!")
 
+    # Start prerendering posts in the background
+    post_buffer.start()
+
+    # Build the fuzzy title index off the event loop
+    application.create_task(asyncio.to_thread(title_index.warm_up))
+
+    # Finish broadcasts interrupted by the last restart, then drop old finished jobs
+    job_store.prune()
+    application.create_task(resume_broadcast_jobs(application.bot))
+
+async def post_stop(application: ApplicationBuilder):
+    """
+    Send what is left in the admin digest while the bot can still talk to Telegram.
+    """
+    await send_admin_digest(application.bot)
+
+async def post_shutdown(application: ApplicationBuilder):
+    """
+    Stop the post producer and render workers, close the shared HTTP connection pool and save the poster/render cache indexes.
+    """
+    await post_buffer.stop()
+    render_service.shutdown()
+    await close_session()
+    poster_cache.flush()
+    render_cache.flush()
+
 if __name__ == "__main__":
     if not TELEGRAM_TOKEN:
         logger.error("❌ ERRORE CRITICO: Variabile d'ambiente TELEGRAM_TOKEN mancante!")
@@ -674,8 +727,11 @@ if __name__ == "__main__":
     if ADMIN_CHAT_ID:
         add_subscriber(ADMIN_CHAT_ID)
 
+    # Fork the render workers now, before the bot starts its own threads
+    render_service.start()
+
     try:
-        application = ApplicationBuilder().token(TELEGRAM_TOKEN).post_init(post_init).build()
+        application = ApplicationBuilder().token(TELEGRAM_TOKEN).post_init(post_init).post_stop(post_stop).post_shutdown(post_shutdown).build()
         
         # Handlers
         application.add_handler(CommandHandler("start", start))
@@ -694,18 +750,30 @@ if __name__ == "__main__":
         application.add_handler(CommandHandler("set_interval", set_interval))
         application.add_handler(CommandHandler("restart", restart))
         
-        # Reaction Handler
-        application.add_handler(TypeHandler(Update, handle_reactions))
+        # Inline mode (enable it with /setinline in BotFather)
+        application.add_handler(InlineQueryHandler(inline_query))
+
+        # Reaction Handler (message_reaction updates only)
+        application.add_handler(MessageReactionHandler(handle_reactions))
         
         # Job Queue
         if application.job_queue:
             application.job_queue.run_repeating(generate_and_broadcast, interval=INTERVAL_SECONDS, first=10, name='broadcast_job')
             logger.info(f"Job Queue avviata. Intervallo: {INTERVAL_MINUTES} minuti.")
+            application.job_queue.run_repeating(
+                flush_admin_digest, interval=DIGEST_WINDOW_SECONDS, first=DIGEST_WINDOW_SECONDS, name='admin_digest'
+            )
+            # Daily TMDB popular refresh (right away if the local copy is missing or stale)
+            application.job_queue.run_repeating(
+                refresh_tmdb_popular, interval=TMDB_POPULAR_REFRESH_SECONDS,
+                first=max(5, tmdb_popular.seconds_until_refresh()), name='tmdb_popular_refresh'
+            )
         else:
             logger.error("JobQueue non disponibile! Assicurati di aver installato python-telegram-bot[job-queue]")
 
         logger.info("Bot is polling... (Premi Ctrl+C per fermare)")
-        application.run_polling()
+        # message_reaction updates are only delivered when requested explicitly
+        application.run_polling(allowed_updates=Update.ALL_TYPES)
         
     except Exception as e:
         logger.error(f"❌ ERRORE AVVIO BOT: {e}")
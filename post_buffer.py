@@ -0,0 +1,86 @@
+import asyncio
+import logging
+from typing import Optional
+from dataclasses import dataclass
+
+logger = logging.getLogger(__name__)
+
+# Wait before retrying when the producer fails (e.g. TMDB/DuckDuckGo down)
+RETRY_DELAY_SECONDS = 60
+
+
+@dataclass
+class Post:
+    title: str
+    ruined_title: str
+    caption: str
+    image_bytes: Optional[bytes]  # Rendered JPEG (None if only the Telegram file_id is known)
+    title_key: Optional[str] = None  # Stable key of the catalog title (None for TMDB fallback titles)
+    render_key: Optional[str] = None  # Render cache key (see render_cache.py)
+    file_id: Optional[str] = None  # Telegram file_id of this exact render, if already uploaded
+
+
+class PostBuffer:
+    """
+    Bounded queue of ready-to-send posts, kept full by a background task.
+    The scheduled job pops a post and sends it right away instead of doing
+    title selection, poster search and rendering while subscribers wait.
+    """
+
+    def __init__(self, produce, size):
+        self._produce = produce  # async callable returning a Post (or None on failure)
+        self.size = size
+        self._queue = None
+        self._task = None
+
+    def start(self):
+        """
+        Starts the background producer. Must be called from inside the running event loop.
+        """
+        if self._task is not None:
+            return
+        self._queue = asyncio.Queue(maxsize=self.size)
+        self._task = asyncio.create_task(self._run())
+        logger.info(f"Post buffer started (size {self.size}).")
+
+    async def stop(self):
+        if self._task is None:
+            return
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+
+    def pop(self):
+        """
+        Returns a prerendered post, or None if the buffer is empty (caller generates inline).
+        """
+        if self._queue is None:
+            return None
+        try:
+            return self._queue.get_nowait()
+        except asyncio.QueueEmpty:
+            return None
+
+    def __len__(self):
+        return self._queue.qsize() if self._queue is not None else 0
+
+    async def _run(self):
+        while True:
+            try:
+                post = await self._produce()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Post buffer producer error: {e}")
+                post = None
+
+            if post is None:
+                await asyncio.sleep(RETRY_DELAY_SECONDS)
+                continue
+
+            # Blocks while the buffer is full
+            await self._queue.put(post)
+            logger.info(f"Prerendered post ready: {post.ruined_title} ({len(self)}/{self.size})")
@@ -0,0 +1,23 @@
+import os
+import hashlib
+from disk_cache import DiskLRUCache
+from storage import data_path
+
+# Downloaded posters, keyed by URL hash.
+# Popular titles come up again and again: no need to re-download the "original" image.
+POSTER_CACHE_DIR = data_path("poster_cache")
+POSTER_CACHE_MAX_MB = int(os.getenv("POSTER_CACHE_MAX_MB", "200"))
+
+poster_cache = DiskLRUCache(POSTER_CACHE_DIR, POSTER_CACHE_MAX_MB * 1024 * 1024)
+
+
+def poster_key(url):
+    return hashlib.sha256(url.encode('utf-8')).hexdigest()
+
+
+def get_cached_poster(url):
+    return poster_cache.get(poster_key(url))
+
+
+def cache_poster(url, data):
+    poster_cache.put(poster_key(url), data)
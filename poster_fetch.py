@@ -0,0 +1,130 @@
+import os
+import re
+import logging
+from urllib.parse import urlparse
+import aiohttp
+from poster_cache import get_cached_poster, cache_poster
+from provider_health import get_health, ProviderUnavailable
+
+logger = logging.getLogger(__name__)
+
+# Async download layer for posters.
+# One shared session = one connection pool with keep-alive, so repeated downloads
+# from the same CDN (image.tmdb.org) reuse the TLS connection.
+FETCH_TIMEOUT_SECONDS = float(os.getenv("POSTER_FETCH_TIMEOUT", "15"))
+CONNECT_TIMEOUT_SECONDS = float(os.getenv("POSTER_CONNECT_TIMEOUT", "5"))
+MAX_CONNECTIONS = int(os.getenv("POSTER_MAX_CONNECTIONS", "20"))
+MAX_CONNECTIONS_PER_HOST = int(os.getenv("POSTER_MAX_CONNECTIONS_PER_HOST", "4"))
+MAX_POSTER_BYTES = 15 * 1024 * 1024  # Anything bigger is not a poster
+
+HEADERS = {
+    'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
+}
+
+# TMDB serves every image at fixed widths. The render is 1080x1080 and a poster is
+# resized to cover it by width, so the smallest width >= 1080 is enough ("original" can be 2000x3000+).
+TMDB_IMAGE_BASE = "https://image.tmdb.org/t/p/"
+TMDB_SIZES = [92, 154, 185, 342, 500, 780, 1280]
+TARGET_WIDTH = 1080
+# Thumbnails and full size variants found in scraped/cached URLs: /t/p/<size>/file.jpg
+TMDB_SIZE_PATTERN = re.compile(r"/t/p/(original|w\d+(_and_h\d+\w*)?)/")
+
+_session = None
+
+
+def tmdb_size_for(target_width=TARGET_WIDTH):
+    for size in TMDB_SIZES:
+        if size >= target_width:
+            return f"w{size}"
+    return "original"
+
+
+def tmdb_poster_url(poster_path, target_width=TARGET_WIDTH):
+    return f"{TMDB_IMAGE_BASE}{tmdb_size_for(target_width)}{poster_path}"
+
+
+def sized_poster_url(url, target_width=TARGET_WIDTH):
+    """
+    Rewrites any TMDB image URL (thumbnail or original) to the smallest size covering the render.
+    Other URLs are returned unchanged.
+    """
+    host = urlparse(url).hostname or ""
+    if not host.endswith(("tmdb.org", "themoviedb.org")):
+        return url
+    return TMDB_SIZE_PATTERN.sub(f"/t/p/{tmdb_size_for(target_width)}/", url, count=1)
+
+
+def get_session():
+    """
+    Returns the shared aiohttp session, creating it on first use.
+    Must be called from inside the running event loop.
+    """
+    global _session
+    if _session is None or _session.closed:
+        connector = aiohttp.TCPConnector(
+            limit=MAX_CONNECTIONS,
+            limit_per_host=MAX_CONNECTIONS_PER_HOST,  # Per-host concurrency limit
+            keepalive_timeout=60,
+            ttl_dns_cache=300,
+        )
+        timeout = aiohttp.ClientTimeout(total=FETCH_TIMEOUT_SECONDS, connect=CONNECT_TIMEOUT_SECONDS)
+        _session = aiohttp.ClientSession(connector=connector, timeout=timeout, headers=HEADERS)
+    return _session
+
+
+async def close_session():
+    global _session
+    if _session is not None and not _session.closed:
+        await _session.close()
+    _session = None
+
+
+async def _download(url):
+    session = get_session()
+    async with session.get(url) as response:
+        if 400 <= response.status < 500:
+            # The host answered: a missing image is not a provider failure
+            logger.warning(f"Poster not available (HTTP {response.status}): {url}")
+            return None
+        response.raise_for_status()
+        if response.content_length and response.content_length > MAX_POSTER_BYTES:
+            logger.warning(f"Poster too big ({response.content_length} bytes): {url}")
+            return None
+        data = bytearray()
+        async for chunk in response.content.iter_chunked(64 * 1024):
+            data.extend(chunk)
+            if len(data) > MAX_POSTER_BYTES:
+                logger.warning(f"Poster too big, download aborted: {url}")
+                return None
+        return bytes(data)
+
+
+async def fetch_poster(url):
+    """
+    Downloads a poster without blocking the event loop.
+    Returns the image bytes, or None on any error (caller falls back to a plain background).
+    Posters already in the on-disk cache are returned without touching the network.
+    Hosts that keep failing are skipped for a while (circuit breaker, see provider_health.py).
+    """
+    if not url:
+        return None
+    url = sized_poster_url(url)
+    cached = get_cached_poster(url)
+    if cached is not None:
+        logger.info(f"Poster cache hit: {url}")
+        return cached
+    host = urlparse(url).hostname or ""
+    health = get_health(f"download:{host}", default_timeout=FETCH_TIMEOUT_SECONDS, max_timeout=FETCH_TIMEOUT_SECONDS)
+    try:
+        data = await health.call(_download, url)
+    except ProviderUnavailable as e:
+        logger.warning(f"Skipping poster download: {e}")
+        return None
+    except Exception as e:
+        logger.error(f"Error downloading poster {url}: {e!r}")
+        return None
+    if data is None:
+        return None
+    logger.info(f"Downloaded poster ({len(data)} bytes): {url}")
+    cache_poster(url, data)
+    return data
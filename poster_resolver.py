@@ -0,0 +1,151 @@
+import os
+import time
+import asyncio
+import logging
+from urllib.parse import quote_plus
+from bs4 import BeautifulSoup
+from duckduckgo_search import DDGS
+import resolution_cache
+from provider_health import get_health
+from poster_fetch import get_session, tmdb_poster_url, sized_poster_url
+
+logger = logging.getLogger(__name__)
+
+# All providers are queried at the same time; the first acceptable poster wins
+# and the others are cancelled. The lookup never takes longer than this.
+RESOLVE_DEADLINE_SECONDS = float(os.getenv("POSTER_RESOLVE_DEADLINE", "8"))
+
+TMDB_SEARCH_URL = "https://api.themoviedb.org/3/search/multi"
+TMDB_WEB_SEARCH_URL = "https://www.themoviedb.org/search"
+
+# Providers return a poster URL, None for a clean "nothing found", and raise on errors
+# (so that errors are never cached as negative results).
+
+
+async def search_tmdb_api(title, api_key):
+    params = {"api_key": api_key, "query": title, "language": "it-IT", "include_adult": "false"}
+    session = get_session()
+    async with session.get(TMDB_SEARCH_URL, params=params) as response:
+        response.raise_for_status()
+        data = await response.json()
+    for item in data.get("results", []):
+        if item.get("media_type") in ("movie", "tv") and item.get("poster_path"):
+            return tmdb_poster_url(item["poster_path"])
+    return None
+
+
+def _parse_tmdb_search_page(html):
+    soup = BeautifulSoup(html, 'lxml')
+    img_tag = soup.select_one("div.card div.image img.poster")
+    if not img_tag:
+        img_tag = soup.select_one(".results .card img")
+    if img_tag:
+        poster_url = img_tag.get('src') or img_tag.get('data-src')
+        if poster_url:
+            if poster_url.startswith('/'):
+                poster_url = f"https://www.themoviedb.org{poster_url}"
+            # Thumbnail -> smallest size that covers the 1080px render
+            return sized_poster_url(poster_url)
+    return None
+
+
+async def search_tmdb_scraping(title):
+    session = get_session()
+    url = f"{TMDB_WEB_SEARCH_URL}?query={quote_plus(title)}"
+    async with session.get(url, headers={'Accept-Language': 'it-IT,it;q=0.9'}) as response:
+        response.raise_for_status()
+        html = await response.text()
+    # HTML parsing is CPU work: keep it off the event loop
+    return await asyncio.to_thread(_parse_tmdb_search_page, html)
+
+
+def _search_duckduckgo_sync(title):
+    search_query = f"{title} locandina film poster"
+    with DDGS() as ddgs:
+        # Search for images, max 1 result
+        results = list(ddgs.images(
+            keywords=search_query,
+            region="it-it",
+            safesearch="on", # Strict SafeSearch
+            size="Large",
+            type_image="photo",
+            max_results=1
+        ))
+    if results:
+        return results[0].get('image')
+    return None
+
+
+async def search_duckduckgo(title):
+    # duckduckgo_search is synchronous: run it in a thread (a cancelled lookup just stops waiting for it)
+    return await asyncio.to_thread(_search_duckduckgo_sync, title)
+
+
+def is_acceptable(url):
+    return bool(url) and url.startswith(("http://", "https://"))
+
+
+class PosterResolver:
+    """
+    Pluggable poster lookup: providers are (name, async callable(title)) pairs,
+    queried concurrently under a shared deadline. Results go through the resolution cache.
+    Each provider has its own circuit breaker and adaptive timeout (provider_health.py).
+    """
+
+    def __init__(self, providers, deadline=RESOLVE_DEADLINE_SECONDS):
+        self.providers = providers
+        self.deadline = deadline
+
+    async def resolve(self, title, deadline=None):
+        """
+        Returns (poster_url, source), or (None, None) if nothing was found in time.
+        """
+        cached = resolution_cache.lookup(title)
+        if cached is not None:
+            poster_url, source = cached
+            logger.info(f"Resolution cache hit for '{title}': {poster_url} ({source})")
+            return poster_url, source
+
+        deadline = deadline or self.deadline
+        start = time.monotonic()
+        # Providers with an open circuit are skipped: no waiting on a source that is down
+        tasks = {}
+        for name, search in self.providers:
+            health = get_health(name, default_timeout=deadline, max_timeout=deadline)
+            if health.is_available():
+                tasks[asyncio.create_task(health.call(search, title))] = name
+        if not tasks:
+            logger.warning(f"All poster providers unavailable. No poster for '{title}'.")
+            return None, None
+        pending = set(tasks)
+        clean_misses = 0
+
+        try:
+            while pending:
+                remaining = deadline - (time.monotonic() - start)
+                if remaining <= 0:
+                    break
+                done, pending = await asyncio.wait(pending, timeout=remaining, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    name = tasks[task]
+                    if task.exception() is not None:
+                        logger.warning(f"Poster provider {name} failed for '{title}': {task.exception()!r}")
+                        continue
+                    poster_url = task.result()
+                    if is_acceptable(poster_url):
+                        elapsed = time.monotonic() - start
+                        logger.info(f"Poster for '{title}' from {name} in {elapsed:.2f}s: {poster_url}")
+                        resolution_cache.store(title, poster_url, name)
+                        return poster_url, name
+                    clean_misses += 1
+        finally:
+            for task in pending:
+                task.cancel()
+
+        if clean_misses == len(self.providers):
+            # Every provider answered "nothing found": cache the negative result
+            resolution_cache.store(title, None, "all")
+            logger.warning(f"No poster found for '{title}'.")
+        else:
+            logger.warning(f"No poster for '{title}': provider errors or {deadline:.1f}s deadline hit (not cached).")
+        return None, None
@@ -0,0 +1,158 @@
+import os
+import time
+import asyncio
+import logging
+from collections import deque
+
+logger = logging.getLogger(__name__)
+
+# Circuit breaker: after FAILURE_THRESHOLD consecutive failures a provider is skipped
+# for a cooldown (doubling up to MAX_COOLDOWN while it keeps failing), then a single
+# probe call decides whether it is healthy again.
+FAILURE_THRESHOLD = int(os.getenv("PROVIDER_FAILURE_THRESHOLD", "3"))
+BASE_COOLDOWN_SECONDS = float(os.getenv("PROVIDER_COOLDOWN_SECONDS", "60"))
+MAX_COOLDOWN_SECONDS = 15 * 60
+
+# Adaptive timeout: a multiple of the recent p95 latency, within [min, max]
+LATENCY_SAMPLES = 50
+MIN_SAMPLES = 5
+TIMEOUT_P95_FACTOR = 2.0
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+
+class ProviderUnavailable(Exception):
+    """
+    Raised instead of calling a provider whose circuit is open.
+    """
+
+
+class CircuitBreaker:
+    def __init__(self, name, failure_threshold=FAILURE_THRESHOLD, base_cooldown=BASE_COOLDOWN_SECONDS):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.base_cooldown = base_cooldown
+        self.state = CLOSED
+        self.failures = 0
+        self.cooldown = base_cooldown
+        self.opened_at = 0.0
+        self._probe_in_flight = False
+
+    def allow(self):
+        if self.state == CLOSED:
+            return True
+        if self.state == OPEN:
+            if time.monotonic() - self.opened_at < self.cooldown:
+                return False
+            self.state = HALF_OPEN
+            logger.info(f"Provider {self.name}: half-open, probing...")
+        # HALF_OPEN: one probe at a time
+        if self._probe_in_flight:
+            return False
+        self._probe_in_flight = True
+        return True
+
+    def release(self):
+        """
+        The call ended without a verdict (e.g. cancelled because another provider won).
+        """
+        self._probe_in_flight = False
+
+    def record_success(self):
+        if self.state != CLOSED:
+            logger.info(f"Provider {self.name}: healthy again, circuit closed.")
+        self.state = CLOSED
+        self.failures = 0
+        self.cooldown = self.base_cooldown
+        self._probe_in_flight = False
+
+    def record_failure(self):
+        self.failures += 1
+        self._probe_in_flight = False
+        if self.state == HALF_OPEN:
+            # Probe failed: back off longer
+            self.cooldown = min(self.cooldown * 2, MAX_COOLDOWN_SECONDS)
+            self._open()
+        elif self.state == CLOSED and self.failures >= self.failure_threshold:
+            self._open()
+
+    def _open(self):
+        self.state = OPEN
+        self.opened_at = time.monotonic()
+        logger.warning(f"Provider {self.name}: circuit open for {self.cooldown:.0f}s after {self.failures} failures.")
+
+
+class LatencyTracker:
+    def __init__(self, default_timeout, min_timeout, max_timeout):
+        self.default_timeout = default_timeout
+        self.min_timeout = min_timeout
+        self.max_timeout = max_timeout
+        self.samples = deque(maxlen=LATENCY_SAMPLES)
+
+    def add(self, seconds):
+        self.samples.append(seconds)
+
+    def percentile(self, p):
+        ordered = sorted(self.samples)
+        return ordered[min(len(ordered) - 1, int(p * len(ordered)))]
+
+    def timeout(self):
+        if len(self.samples) < MIN_SAMPLES:
+            return self.default_timeout
+        return max(self.min_timeout, min(self.max_timeout, self.percentile(0.95) * TIMEOUT_P95_FACTOR))
+
+
+class ProviderHealth:
+    """
+    Circuit breaker + adaptive timeout for one external provider.
+    """
+
+    def __init__(self, name, default_timeout=10.0, min_timeout=1.0, max_timeout=20.0):
+        self.name = name
+        self.breaker = CircuitBreaker(name)
+        self.latency = LatencyTracker(default_timeout, min_timeout, max_timeout)
+
+    def is_available(self):
+        # Does not reserve the half-open probe, only used to skip providers early
+        return self.breaker.state == CLOSED or time.monotonic() - self.breaker.opened_at >= self.breaker.cooldown
+
+    async def call(self, func, *args):
+        """
+        Awaits func(*args) under the adaptive timeout.
+        Raises ProviderUnavailable without calling it if the circuit is open.
+        """
+        if not self.breaker.allow():
+            raise ProviderUnavailable(f"{self.name} is unavailable (circuit open)")
+        start = time.monotonic()
+        try:
+            result = await asyncio.wait_for(func(*args), timeout=self.latency.timeout())
+        except asyncio.CancelledError:
+            self.breaker.release()
+            raise
+        except Exception:
+            self.breaker.record_failure()
+            raise
+        self.latency.add(time.monotonic() - start)
+        self.breaker.record_success()
+        return result
+
+    def status(self):
+        return f"{self.name}: {self.breaker.state}, timeout {self.latency.timeout():.1f}s"
+
+
+_registry = {}
+
+
+def get_health(name, **kwargs):
+    """
+    Returns the shared ProviderHealth for name (created on first use with kwargs).
+    """
+    if name not in _registry:
+        _registry[name] = ProviderHealth(name, **kwargs)
+    return _registry[name]
+
+
+def all_statuses():
+    return [health.status() for health in _registry.values()]
@@ -0,0 +1,54 @@
+import os
+import json
+import hashlib
+import logging
+from disk_cache import DiskLRUCache
+from storage import data_path
+from image_generator import render_style
+
+logger = logging.getLogger(__name__)
+
+# Finished renders, keyed by (ruined title, poster content, renderer version, style).
+# A title that comes back (rotation, /publish twice, inline) reuses the same JPEG,
+# and once Telegram has it, the same file_id: no render and no upload.
+RENDER_CACHE_DIR = data_path("render_cache")
+RENDER_CACHE_MAX_MB = int(os.getenv("RENDER_CACHE_MAX_MB", "100"))
+FILE_ID_SUFFIX = ".file_id"
+
+
+class RenderCache:
+    """
+    JPEGs and their Telegram file_ids in one size-bounded DiskLRUCache
+    (the file_id is a separate tiny entry, so it can outlive an evicted JPEG).
+    """
+
+    def __init__(self, directory=RENDER_CACHE_DIR, max_bytes=RENDER_CACHE_MAX_MB * 1024 * 1024):
+        self.cache = DiskLRUCache(directory, max_bytes)
+        self._style = None
+
+    def key(self, text, background_bytes):
+        if self._style is None:
+            self._style = json.dumps(render_style(), sort_keys=True)
+        background_hash = hashlib.sha256(background_bytes).hexdigest() if background_bytes else "none"
+        material = json.dumps([text, background_hash, self._style])
+        return hashlib.sha256(material.encode("utf-8")).hexdigest()
+
+    def get_image(self, key):
+        return self.cache.get(key)
+
+    def put_image(self, key, image_bytes):
+        self.cache.put(key, image_bytes)
+
+    def get_file_id(self, key):
+        data = self.cache.get(key + FILE_ID_SUFFIX)
+        return data.decode("utf-8") if data else None
+
+    def set_file_id(self, key, file_id):
+        if key and file_id and self.get_file_id(key) != file_id:
+            self.cache.put(key + FILE_ID_SUFFIX, file_id.encode("utf-8"))
+
+    def flush(self):
+        self.cache.flush()
+
+
+render_cache = RenderCache()
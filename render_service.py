@@ -0,0 +1,88 @@
+import os
+import asyncio
+import logging
+import threading
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+import image_generator
+
+logger = logging.getLogger(__name__)
+
+# create_image() is CPU-bound (resize, compositing, text, JPEG encode):
+# it runs in worker processes so renders use all cores and never block the bot.
+RENDER_WORKERS = int(os.getenv("RENDER_WORKERS", str(min(2, os.cpu_count() or 1))))
+
+
+def _warm_up():
+    # Runs once in every worker process: fonts and the watermark layer are loaded before the first job
+    image_generator.warm_assets()
+
+
+def _ping():
+    return os.getpid()
+
+
+def _render(text, background_bytes):
+    return image_generator.create_image(text, background_bytes=background_bytes)
+
+
+class RenderService:
+    """
+    Awaitable rendering API backed by a pool of warm worker processes.
+    """
+
+    def __init__(self, workers=RENDER_WORKERS):
+        self.workers = workers
+        self._executor = None
+        self._lock = threading.Lock()  # start() may run in a worker thread (see render())
+
+    def start(self):
+        """
+        Starts the workers and waits until they are warm (blocking: from the event loop,
+        run it in a thread). Call it early (before the bot starts its threads).
+        """
+        with self._lock:
+            if self._executor is not None:
+                return
+            # "fork": workers must not re-import main.py (spawn/forkserver would run its module-level setup).
+            # Where fork does not exist (Windows) the platform default is the only option.
+            method = "fork" if "fork" in multiprocessing.get_all_start_methods() else None
+            context = multiprocessing.get_context(method)
+            executor = ProcessPoolExecutor(max_workers=self.workers, mp_context=context, initializer=_warm_up)
+            pids = {f.result() for f in [executor.submit(_ping) for _ in range(self.workers)]}
+            self._executor = executor
+        logger.info(f"Render service started: {len(pids)} worker processes ready ({context.get_start_method()}).")
+
+    def shutdown(self):
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=False, cancel_futures=True)
+
+    def _restart(self, broken):
+        # Concurrent renders all see the same broken pool: only the first one replaces it
+        with self._lock:
+            if self._executor is broken:
+                self._executor = None
+        if broken is not None:
+            broken.shutdown(wait=False, cancel_futures=True)
+        self.start()
+
+    async def render(self, text, background_bytes=None):
+        """
+        Renders the post image and returns the JPEG bytes.
+        Starting (or restarting) the pool waits for the workers to warm up, so it runs off the event loop.
+        """
+        executor = self._executor
+        if executor is None:
+            await asyncio.to_thread(self.start)
+            executor = self._executor
+        loop = asyncio.get_running_loop()
+        try:
+            return await loop.run_in_executor(executor, _render, text, background_bytes)
+        except BrokenProcessPool:
+            # A worker died (e.g. out of memory on a huge image): restart the pool and retry once
+            logger.error("Render worker died. Restarting render pool...")
+            await asyncio.to_thread(self._restart, executor)
+            return await loop.run_in_executor(self._executor, _render, text, background_bytes)
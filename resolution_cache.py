@@ -0,0 +1,72 @@
+import os
+import time
+import threading
+import logging
+from storage import data_path, connect_sqlite
+
+logger = logging.getLogger(__name__)
+
+# Persistent cache of poster lookups (title -> poster URL + source).
+# "No poster found" is cached too, with a shorter TTL, so we don't hammer the search
+# for titles that have no image.
+RESOLUTION_DB = data_path("resolution_cache.db")
+POSITIVE_TTL_SECONDS = int(os.getenv("POSTER_CACHE_TTL_DAYS", "30")) * 86400
+NEGATIVE_TTL_SECONDS = int(os.getenv("POSTER_NEGATIVE_TTL_HOURS", "24")) * 3600
+
+_conn = None
+_lock = threading.Lock()
+
+
+def _get_conn():
+    global _conn
+    if _conn is None:
+        _conn = connect_sqlite(RESOLUTION_DB)
+        _conn.execute(
+            "CREATE TABLE IF NOT EXISTS resolutions ("
+            " title_key TEXT PRIMARY KEY,"
+            " poster_url TEXT,"
+            " source TEXT,"
+            " expires_at REAL NOT NULL)"
+        )
+        _conn.commit()
+    return _conn
+
+
+def title_key(title):
+    return " ".join(title.lower().split())
+
+
+def lookup(title):
+    """
+    Returns (poster_url, source) for a cached title, or None on a miss/expired entry.
+    poster_url is None for a cached "no poster found".
+    """
+    try:
+        with _lock:
+            row = _get_conn().execute(
+                "SELECT poster_url, source, expires_at FROM resolutions WHERE title_key = ?",
+                (title_key(title),)
+            ).fetchone()
+    except Exception as e:
+        logger.error(f"Error reading resolution cache: {e}")
+        return None
+    if not row or row[2] < time.time():
+        return None
+    return row[0], row[1]
+
+
+def store(title, poster_url, source):
+    """
+    Caches a lookup result. poster_url=None records a negative result (shorter TTL).
+    """
+    ttl = POSITIVE_TTL_SECONDS if poster_url else NEGATIVE_TTL_SECONDS
+    try:
+        with _lock:
+            conn = _get_conn()
+            conn.execute(
+                "INSERT OR REPLACE INTO resolutions (title_key, poster_url, source, expires_at) VALUES (?, ?, ?, ?)",
+                (title_key(title), poster_url, source, time.time() + ttl)
+            )
+            conn.commit()
+    except Exception as e:
+        logger.error(f"Error writing resolution cache: {e}")
@@ -0,0 +1,20 @@
+import os
+import sqlite3
+
+# Persistent volume when running in Docker (see docker-compose.yml), current directory otherwise
+DATA_DIR = "/data" if os.path.exists("/data") else "."
+
+
+def data_path(name):
+    return os.path.join(DATA_DIR, name)
+
+
+def connect_sqlite(path):
+    """
+    Opens a SQLite database in WAL mode (readers never block the writer).
+    The connection can be shared between threads; callers serialize access with their own lock.
+    """
+    conn = sqlite3.connect(path, check_same_thread=False, timeout=30)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    return conn
@@ -0,0 +1,187 @@
+import json
+import os
+import time
+import threading
+import logging
+from storage import connect_sqlite
+from broadcaster import is_permanent_error
+
+logger = logging.getLogger(__name__)
+
+ITER_BATCH_SIZE = 1000
+# A chat is removed after this many broadcasts in a row failed with a permanent error
+# (bot blocked, chat deleted...). Any successful delivery resets the count.
+DEAD_SUBSCRIBER_STRIKES = int(os.getenv("DEAD_SUBSCRIBER_STRIKES", "3"))
+STRIKE_BATCH_SIZE = 100
+
+
+class SubscriberStore:
+    """
+    Subscribers in SQLite (WAL mode): /start and /stop are single-row inserts/deletes
+    on the primary key instead of rewriting the whole list.
+    """
+
+    def __init__(self, db_path, legacy_json_path=None):
+        self.db_path = db_path
+        self._lock = threading.Lock()
+        self._conn = connect_sqlite(db_path)
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS subscribers ("
+            " chat_id TEXT PRIMARY KEY,"
+            " subscribed_at REAL NOT NULL,"
+            " strikes INTEGER NOT NULL DEFAULT 0)"
+        )
+        columns = [row[1] for row in self._conn.execute("PRAGMA table_info(subscribers)")]
+        if "strikes" not in columns:
+            # Databases created before dead-subscriber pruning
+            self._conn.execute("ALTER TABLE subscribers ADD COLUMN strikes INTEGER NOT NULL DEFAULT 0")
+        self._conn.commit()
+        if legacy_json_path:
+            self._migrate_json(legacy_json_path)
+
+    def _migrate_json(self, path):
+        """
+        One-time import of the old subscribers.json. The file is renamed afterwards
+        so the migration never runs twice.
+        """
+        if not os.path.exists(path):
+            return
+        try:
+            with open(path, 'r') as f:
+                chat_ids = json.load(f)
+        except Exception as e:
+            logger.error(f"Error reading legacy subscribers file {path}: {e}")
+            return
+        added = self.add_many(chat_ids)
+        os.replace(path, path + ".migrated")
+        logger.info(f"Migrated {added} subscribers from {path} to {self.db_path}")
+
+    def add(self, chat_id):
+        """
+        Returns True if the chat was not subscribed yet.
+        """
+        with self._lock:
+            cursor = self._conn.execute(
+                "INSERT OR IGNORE INTO subscribers (chat_id, subscribed_at) VALUES (?, ?)",
+                (str(chat_id), time.time())
+            )
+            self._conn.commit()
+            return cursor.rowcount > 0
+
+    def remove(self, chat_id):
+        """
+        Returns True if the chat was subscribed.
+        """
+        with self._lock:
+            cursor = self._conn.execute("DELETE FROM subscribers WHERE chat_id = ?", (str(chat_id),))
+            self._conn.commit()
+            return cursor.rowcount > 0
+
+    def add_many(self, chat_ids):
+        """
+        Adds many chats in a single transaction. Returns how many were new.
+        """
+        now = time.time()
+        with self._lock:
+            before = self._conn.total_changes
+            with self._conn:
+                self._conn.executemany(
+                    "INSERT OR IGNORE INTO subscribers (chat_id, subscribed_at) VALUES (?, ?)",
+                    ((str(chat_id), now) for chat_id in chat_ids)
+                )
+            return self._conn.total_changes - before
+
+    def add_strikes(self, chat_ids, max_strikes=DEAD_SUBSCRIBER_STRIKES):
+        """
+        Adds a strike to each chat and removes the ones that reached max_strikes,
+        in a single transaction. Returns the removed chat ids.
+        """
+        chat_ids = [str(chat_id) for chat_id in chat_ids]
+        if not chat_ids:
+            return []
+        placeholders = ", ".join("?" * len(chat_ids))
+        with self._lock:
+            with self._conn:
+                self._conn.execute(f"UPDATE subscribers SET strikes = strikes + 1 WHERE chat_id IN ({placeholders})", chat_ids)
+                rows = self._conn.execute(
+                    f"SELECT chat_id FROM subscribers WHERE chat_id IN ({placeholders}) AND strikes >= ?",
+                    chat_ids + [max_strikes]
+                ).fetchall()
+                removed = [chat_id for (chat_id,) in rows]
+                self._conn.executemany("DELETE FROM subscribers WHERE chat_id = ?", rows)
+        return removed
+
+    def clear_strikes(self, chat_ids):
+        """
+        Resets the strikes of chats that received a message (only rows that have any are written).
+        """
+        with self._lock:
+            with self._conn:
+                self._conn.executemany(
+                    "UPDATE subscribers SET strikes = 0 WHERE chat_id = ? AND strikes > 0",
+                    ((str(chat_id),) for chat_id in chat_ids)
+                )
+
+    def count(self):
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM subscribers").fetchone()[0]
+
+    def __contains__(self, chat_id):
+        with self._lock:
+            row = self._conn.execute("SELECT 1 FROM subscribers WHERE chat_id = ?", (str(chat_id),)).fetchone()
+            return row is not None
+
+    def iter_ids(self, batch_size=ITER_BATCH_SIZE):
+        """
+        Streams all chat ids in primary key order, one batch at a time.
+        Each batch is a fresh query, so subscribers can be added/removed during a long fan-out.
+        """
+        last = ""
+        while True:
+            with self._lock:
+                rows = self._conn.execute(
+                    "SELECT chat_id FROM subscribers WHERE chat_id > ? ORDER BY chat_id LIMIT ?",
+                    (last, batch_size)
+                ).fetchall()
+            if not rows:
+                return
+            for (chat_id,) in rows:
+                yield chat_id
+            last = rows[-1][0]
+
+
+class DeadSubscriberPruner:
+    """
+    Collects delivery outcomes during a broadcast and applies them to the store in batches:
+    permanent errors add a strike (removal after DEAD_SUBSCRIBER_STRIKES),
+    successes clear strikes, transient errors (timeouts, flood control) are ignored.
+    """
+
+    def __init__(self, store, batch_size=STRIKE_BATCH_SIZE):
+        self.store = store
+        self.batch_size = batch_size
+        self._delivered = []
+        self._dead = []
+        self.removed = 0
+
+    def record(self, chat_id, error=None):
+        if error is None:
+            self._delivered.append(chat_id)
+        elif is_permanent_error(error):
+            self._dead.append(chat_id)
+        if len(self._delivered) + len(self._dead) >= self.batch_size:
+            self.flush()
+
+    def flush(self):
+        delivered, self._delivered = self._delivered, []
+        dead, self._dead = self._dead, []
+        try:
+            if delivered:
+                self.store.clear_strikes(delivered)
+            removed = self.store.add_strikes(dead)
+        except Exception as e:
+            logger.error(f"Error updating subscriber strikes: {e}")
+            return
+        if removed:
+            self.removed += len(removed)
+            logger.info(f"Removed {len(removed)} unreachable subscribers: {removed}")
@@ -0,0 +1,191 @@
+import os
+import json
+import zlib
+import random
+import hashlib
+import logging
+from title_index import normalize
+
+logger = logging.getLogger(__name__)
+
+# Feistel rounds of the permutation (4 is plenty to shuffle a title list)
+FEISTEL_ROUNDS = 4
+
+
+class FeistelPermutation:
+    """
+    Seeded bijection of [0, n): a Feistel network on the smallest even-bit domain
+    that covers n, with cycle-walking to stay inside the range.
+    No table is stored, so the state of a shuffled deck is just (seed, cursor).
+    """
+
+    def __init__(self, n, seed):
+        self.n = n
+        bits = max(2, (n - 1).bit_length())
+        bits += bits % 2
+        self.half_bits = bits // 2
+        self.mask = (1 << self.half_bits) - 1
+        rng = random.Random(seed)
+        self.keys = [rng.getrandbits(64).to_bytes(8, "little") for _ in range(FEISTEL_ROUNDS)]
+
+    def _round(self, x, key):
+        digest = hashlib.blake2b(x.to_bytes(4, "little"), digest_size=4, key=key).digest()
+        return int.from_bytes(digest, "little") & self.mask
+
+    def _encrypt(self, x):
+        left, right = x >> self.half_bits, x & self.mask
+        for key in self.keys:
+            left, right = right, left ^ self._round(right, key)
+        return (left << self.half_bits) | right
+
+    def __getitem__(self, i):
+        # Domain is at most 4n: a few steps on average to land back in range
+        x = self._encrypt(i)
+        while x >= self.n:
+            x = self._encrypt(x)
+        return x
+
+
+def catalog_fingerprint(catalog):
+    """
+    Cheap identity of a catalog: size plus a checksum of a few titles.
+    """
+    n = len(catalog)
+    sample = [catalog.titles[i] for i in sorted({0, n // 2, n - 1})] if n else []
+    return f"{n}:{zlib.crc32('|'.join(sample).encode('utf-8')):08x}"
+
+
+def title_keys(catalog, index):
+    """
+    Stable identities of a catalog title, independent of its position in the catalog:
+    "tmdb:<id>" when the TMDB id is known, then "t:<hash of the normalized title>".
+    The first one is the key that gets recorded; the title key still matches when a
+    catalog rebuild adds the TMDB id later.
+    """
+    digest = hashlib.blake2b(normalize(catalog.titles[index]).encode("utf-8"), digest_size=8).hexdigest()
+    keys = [f"t:{digest}"]
+    tmdb_id = catalog.tmdb_ids[index]
+    if tmdb_id:
+        keys.insert(0, f"tmdb:{tmdb_id}")
+    return keys
+
+
+class TitleDeck:
+    """
+    Persistent no-repeat scheduler over a TitleCatalog.
+    Titles are dealt in a seeded random order (one "deck" per epoch): no title comes
+    back before the whole deck has been dealt. Saved in state_path as
+    {"seed", "cursor", "epoch", "fingerprint"}, plus the titles published in this epoch
+    in published_path (one stable key per line, see title_keys). Both survive restarts
+    and redeploys (/data).
+    Published titles are recorded by key, not by catalog position: when the catalog is
+    rebuilt the deck is reshuffled over the new catalog, but what was already published
+    in this epoch stays published.
+    The recency bias is kept: when an old title comes up it is only dealt with
+    probability equal to its weight, otherwise it waits for a later deck.
+    """
+
+    def __init__(self, catalog, state_path, published_path, rng=None):
+        self.catalog = catalog
+        self.state_path = state_path
+        self.published_path = published_path
+        self.rng = rng or random.Random()
+        self.fingerprint = catalog_fingerprint(catalog)
+        self._load()
+
+    def _load(self):
+        state = {}
+        if os.path.exists(self.state_path):
+            try:
+                with open(self.state_path, 'r') as f:
+                    state = json.load(f)
+            except Exception as e:
+                logger.error(f"Error reading {self.state_path}: {e}")
+        self.published = set()
+        if os.path.exists(self.published_path):
+            with open(self.published_path, 'r') as f:
+                self.published = {line.strip() for line in f if line.strip()}
+
+        if state.get("fingerprint") == self.fingerprint:
+            self.seed = state["seed"]
+            self.cursor = state["cursor"]
+            self.epoch = state["epoch"]
+            self.permutation = FeistelPermutation(len(self.catalog), self.seed)
+            logger.info(f"Title deck: epoch {self.epoch}, {self.cursor}/{len(self.catalog)} dealt, {self.published_count()} published.")
+        elif state:
+            # Positions are meaningless in the new catalog: reshuffle, but keep the published keys
+            logger.warning(f"Title deck: catalog changed, reshuffling ({self.published_count()} published titles kept).")
+            self._shuffle(state.get("epoch", 1))
+        else:
+            self._new_epoch(1)
+
+    def _shuffle(self, epoch):
+        self.seed = self.rng.getrandbits(64)
+        self.cursor = 0
+        self.epoch = epoch
+        self.permutation = FeistelPermutation(len(self.catalog), self.seed)
+        self._save_state()
+
+    def _new_epoch(self, epoch):
+        self.published = set()
+        self._save_published()
+        self._shuffle(epoch)
+
+    def _save_state(self):
+        state = {"seed": self.seed, "cursor": self.cursor, "epoch": self.epoch, "fingerprint": self.fingerprint}
+        tmp_path = self.state_path + ".tmp"
+        with open(tmp_path, 'w') as f:
+            json.dump(state, f)
+        os.replace(tmp_path, self.state_path)
+
+    def _save_published(self):
+        tmp_path = self.published_path + ".tmp"
+        with open(tmp_path, 'w') as f:
+            f.writelines(f"{key}\n" for key in sorted(self.published))
+        os.replace(tmp_path, self.published_path)
+
+    def key(self, index):
+        """
+        Stable key of the title at this catalog index (what broadcast jobs carry).
+        """
+        return title_keys(self.catalog, index)[0]
+
+    def is_published(self, index):
+        return any(key in self.published for key in title_keys(self.catalog, index))
+
+    def published_count(self):
+        return len(self.published)
+
+    def draw(self):
+        """
+        Returns the catalog index of the next title, or None if the catalog is empty.
+        Starts a new deck when the current one is exhausted.
+        """
+        n = len(self.catalog)
+        if n == 0:
+            return None
+        while True:
+            if self.cursor >= n:
+                logger.info(f"Title deck: epoch {self.epoch} completed, reshuffling.")
+                self._new_epoch(self.epoch + 1)
+            index = self.permutation[self.cursor]
+            self.cursor += 1
+            if self.is_published(index):
+                continue
+            if self.rng.random() < self.catalog.weights[index]:
+                break
+        self._save_state()
+        return index
+
+    def mark_published(self, key):
+        """
+        Records that the title with this key was actually sent to subscribers (one line appended).
+        """
+        if key is None or key in self.published:
+            return
+        self.published.add(key)
+        try:
+            with open(self.published_path, 'a') as f:
+                f.write(f"{key}\n")
+        except Exception as e:
+            logger.error(f"Error saving {self.published_path}: {e}")
@@ -0,0 +1,118 @@
+import re
+import heapq
+import threading
+import unicodedata
+import logging
+from array import array
+from collections import Counter, namedtuple
+
+logger = logging.getLogger(__name__)
+
+# Candidates are collected from the rarest query trigrams only (very common ones like
+# " la" match thousands of titles and would dominate the cost), then the best
+# CANDIDATES are re-ranked with the exact Dice score.
+COMMON_TRIGRAM_POSTINGS = 500
+CANDIDATES = 30
+
+# A search result: catalog is the source TitleCatalog, index the position in it
+Match = namedtuple("Match", ["title", "score", "source", "catalog", "index"])
+
+_NON_ALNUM = re.compile(r"[^0-9a-z]+")
+
+
+def normalize(text):
+    """
+    Lowercase, no accents, no punctuation: "Così è la vita!" -> "cosi e la vita".
+    """
+    text = unicodedata.normalize("NFKD", text.lower())
+    text = "".join(c for c in text if not unicodedata.combining(c))
+    return _NON_ALNUM.sub(" ", text).strip()
+
+
+def trigrams(normalized):
+    padded = f"  {normalized} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+class TitleIndex:
+    """
+    In-memory trigram index over one or more title catalogs, for fuzzy matching of
+    free-text titles (/suggest, /publish). Built on first use (or by warm_up()).
+    Titles present in more than one catalog are indexed once, from the first catalog.
+    """
+
+    def __init__(self, sources):
+        self.sources = sources  # [(name, TitleCatalog), ...] in priority order
+        self._lock = threading.Lock()
+        self._built = False
+
+    def _build(self):
+        self._entries = []  # (source name, catalog, index)
+        self._keys = []  # normalized title per entry
+        self._exact = {}  # normalized title -> entry id
+        postings = {}
+        for name, catalog in self.sources:
+            for i, title in enumerate(catalog.titles):
+                key = normalize(title)
+                if not key or key in self._exact:
+                    continue
+                entry_id = len(self._entries)
+                self._exact[key] = entry_id
+                self._entries.append((name, catalog, i))
+                self._keys.append(key)
+                for gram in trigrams(key):
+                    postings.setdefault(gram, array("I")).append(entry_id)
+        self._postings = postings
+        logger.info(f"Title index built: {len(self._entries)} titles, {len(postings)} trigrams.")
+
+    def warm_up(self):
+        with self._lock:
+            if not self._built:
+                self._build()
+                self._built = True
+
+    def __len__(self):
+        self.warm_up()
+        return len(self._entries)
+
+    def _match(self, entry_id, score):
+        name, catalog, i = self._entries[entry_id]
+        return Match(catalog.titles[i], score, name, catalog, i)
+
+    def search(self, query, k=5):
+        """
+        Returns up to k Matches, best first. score is the Dice coefficient on trigrams
+        (1.0 = same title once normalized).
+        """
+        self.warm_up()
+        key = normalize(query)
+        if not key:
+            return []
+        exact = self._exact.get(key)
+        query_grams = trigrams(key)
+        postings = sorted((p for p in map(self._postings.get, query_grams) if p is not None), key=len)
+        # At least half of the query trigrams, plus all the rare ones
+        needed = max((len(query_grams) + 1) // 2, sum(1 for p in postings if len(p) <= COMMON_TRIGRAM_POSTINGS))
+        shared = Counter()
+        for posting in postings[:needed]:
+            shared.update(posting)
+
+        def dice(entry_id):
+            grams = trigrams(self._keys[entry_id])
+            return 2.0 * len(query_grams & grams) / (len(query_grams) + len(grams))
+
+        candidates = [entry_id for entry_id, _ in shared.most_common(CANDIDATES)]
+        best = heapq.nlargest(k, ((dice(entry_id), entry_id) for entry_id in candidates))
+        results = [self._match(entry_id, score) for score, entry_id in best if entry_id != exact]
+        if exact is not None:
+            results.insert(0, self._match(exact, 1.0))
+        return results[:k]
+
+    def best(self, query, min_score):
+        """
+        Returns the best Match if its score is at least min_score, else None.
+        """
+        results = self.search(query, k=1)
+        if results and results[0].score >= min_score:
+            return results[0]
+        return None
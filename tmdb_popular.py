@@ -0,0 +1,122 @@
+import os
+import json
+import time
+import random
+import asyncio
+import logging
+from poster_fetch import get_session
+from provider_health import get_health
+
+logger = logging.getLogger(__name__)
+
+# TMDB popular movies/TV, refreshed once a day into a small local file.
+# Random picks are served from memory: zero API calls per post.
+TMDB_API_BASE = "https://api.themoviedb.org/3"
+# Reduced max page to 20 to ensure higher quality/popularity and images
+MAX_PAGE = 20
+KINDS = ("movie", "tv")
+REFRESH_INTERVAL_SECONDS = 24 * 3600
+REFRESH_CONCURRENCY = 4
+
+
+class TmdbPopularStore:
+    """
+    Local copy of the first MAX_PAGE popular pages, only items with a poster.
+    Saved as {"fetched_at": ..., "movie": [[title, poster_path], ...], "tv": [...]}.
+    """
+
+    def __init__(self, path, api_key, language='it-IT'):
+        self.path = path
+        self.api_key = api_key
+        self.language = language
+        self.fetched_at = 0.0
+        self.items = {kind: [] for kind in KINDS}
+        self._load()
+
+    def _load(self):
+        if not os.path.exists(self.path):
+            return
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+            self.fetched_at = data.get("fetched_at", 0.0)
+            for kind in KINDS:
+                self.items[kind] = [tuple(item) for item in data.get(kind, [])]
+            logger.info(f"TMDB popular loaded: {len(self.items['movie'])} movies, {len(self.items['tv'])} TV series.")
+        except Exception as e:
+            logger.error(f"Error reading {self.path}: {e}")
+
+    def _save(self):
+        data = {"fetched_at": self.fetched_at}
+        data.update({kind: self.items[kind] for kind in KINDS})
+        tmp_path = self.path + ".tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(data, f, ensure_ascii=False)
+        os.replace(tmp_path, self.path)
+
+    def seconds_until_refresh(self):
+        return max(0.0, self.fetched_at + REFRESH_INTERVAL_SECONDS - time.time())
+
+    def pick(self):
+        """
+        Returns (title, poster_path) of a random popular movie or TV show, or None if the store is empty.
+        """
+        # Randomly choose between Movie and TV (or whichever one we have)
+        kinds = [kind for kind in KINDS if self.items[kind]]
+        if not kinds:
+            return None
+        return random.choice(self.items[random.choice(kinds)])
+
+    async def _fetch_page(self, kind, page):
+        params = {"api_key": self.api_key, "language": self.language, "page": page}
+        session = get_session()
+        async with session.get(f"{TMDB_API_BASE}/{kind}/popular", params=params) as response:
+            response.raise_for_status()
+            data = await response.json()
+        items = []
+        for item in data.get("results", []):
+            title = item.get("title") or item.get("name")
+            if title and item.get("poster_path"):
+                items.append((title, item["poster_path"]))
+        return items
+
+    async def refresh(self):
+        """
+        Downloads all popular pages (bounded concurrency). A kind that fails
+        completely keeps its previous items.
+        """
+        if not self.api_key:
+            logger.warning("TMDB_API_KEY mancante! Impossibile aggiornare i popolari TMDB.")
+            return
+        health = get_health("tmdb_popular")
+        semaphore = asyncio.Semaphore(REFRESH_CONCURRENCY)
+
+        async def fetch(kind, page):
+            async with semaphore:
+                try:
+                    return kind, await health.call(self._fetch_page, kind, page)
+                except Exception as e:
+                    logger.warning(f"TMDB popular {kind} page {page} failed: {e!r}")
+                    return kind, []
+
+        results = await asyncio.gather(*(fetch(kind, page) for kind in KINDS for page in range(1, MAX_PAGE + 1)))
+        fresh = {kind: [] for kind in KINDS}
+        seen = set()
+        for kind, items in results:
+            for item in items:
+                if (kind, item) not in seen:
+                    seen.add((kind, item))
+                    fresh[kind].append(item)
+
+        if not any(fresh.values()):
+            logger.error("TMDB popular refresh failed, keeping the old list.")
+            return
+        for kind in KINDS:
+            if fresh[kind]:
+                self.items[kind] = fresh[kind]
+        self.fetched_at = time.time()
+        try:
+            self._save()
+        except Exception as e:
+            logger.error(f"Error saving {self.path}: {e}")
+        logger.info(f"TMDB popular refreshed: {len(self.items['movie'])} movies, {len(self.items['tv'])} TV series.")